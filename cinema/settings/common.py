@@ -146,13 +146,77 @@ locale.setlocale(locale.LC_ALL, "fa_IR.UTF-8")
 
 CELERY_BROKER_URL = 'redis://localhost:6379/1'
 
+# Generations (see core.generations) and cached payloads are shared by
+# every web process and Celery worker.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/3',
+    }
+}
+
+# Film visits are buffered and written to the database in batches.
+VISIT_COUNT_BUFFER = {
+    'BACKEND': 'movie.visits.RedisVisitBuffer',
+    'OPTIONS': {'url': 'redis://localhost:6379/2'},
+}
+VISIT_COUNT_FLUSH_INTERVAL = 60  # seconds
+
+# Trending films are ranked by visits that lose half their weight every
+# half-life; see movie.popularity.
+FILM_POPULARITY_HALF_LIFE = 3 * 24 * 60 * 60  # seconds
+FILM_POPULARITY_DECAY_INTERVAL = 60 * 60  # seconds
+
+FILM_DETAIL_CACHE_TIMEOUT = 60 * 60  # seconds
+FILM_FACETS_CACHE_TIMEOUT = 60 * 60  # seconds
+
+# Process-local inverted index used to filter the public catalog by
+# genres, countries, languages, collections and actors; see
+# movie.film_index.
+FILM_INDEX = {
+    "ENABLED": True,
+    "TTL": 5 * 60,  # seconds
+    "MAX_ENTRIES": 5_000_000,
+    # Larger id sets are filtered with SQL joins instead.
+    "MAX_RESULTS": 10_000,
+}
+
+# Films read per query (with their relations) by the catalog export.
+FILM_EXPORT_CHUNK_SIZE = 500
+
+# Offline "similar films" recommendations; see movie.similarity.
+FILM_SIMILARITY = {
+    "TOP_K": 12,
+    # Films whose similarity scores are held in memory at once.
+    "CHUNK_SIZE": 500,
+    "MIN_SCORE": 0.05,
+}
+
 CELERY_BEAT_SCHEDULE = {
     'delete_rejected_comments': {
         'task': 'movie.tasks.delete_rejected_comments',
         'schedule': crontab(day_of_week='1')
-    }
+    },
+    'flush_visit_counts': {
+        'task': 'movie.tasks.flush_visit_counts',
+        'schedule': VISIT_COUNT_FLUSH_INTERVAL,
+    },
+    'decay_film_popularity': {
+        'task': 'movie.tasks.decay_film_popularity',
+        'schedule': FILM_POPULARITY_DECAY_INTERVAL,
+    },
+    'compute_similar_films': {
+        'task': 'movie.tasks.compute_similar_films',
+        'schedule': crontab(hour='4', minute='0'),
+    },
 }
 
 ADMIN_LIST_PER_PAGE = 5
 
+# Replies shown under each comment; the rest are fetched page by page from
+# /films/{id}/comments/{id}/replies/.
+COMMENT_REPLIES_PREVIEW = 3
+# Levels of replies previewed below each listed comment.
+COMMENT_REPLIES_DEPTH = 3
+
 VISIT_COUNT_DEFAULT_SESSION_DURATION = 24 * 60 * 60  # seconds
@@ -17,6 +17,17 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+VISIT_COUNT_BUFFER = {
+    'BACKEND': 'movie.visits.LocalVisitBuffer',
+    'OPTIONS': {'flush_interval': VISIT_COUNT_FLUSH_INTERVAL},
+}
+
 CORS_ALLOW_ALL_ORIGINS = True
 
 CORS_ALLOW_CREDENTIALS = True
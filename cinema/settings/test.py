@@ -0,0 +1,14 @@
+from .dev import *
+
+DATABASES['default'].update({
+    # Take the write lock up front and wait for it, so the concurrency
+    # tests queue up instead of failing with "database is locked".
+    'OPTIONS': {
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 20,
+    },
+    # A file database lets the concurrency tests use real connections.
+    'TEST': {
+        'NAME': BASE_DIR.parent / 'test_db.sqlite3',
+    },
+})
@@ -0,0 +1,107 @@
+"""
+Conditional GET support (ETag / Last-Modified) for DRF views.
+
+Views derive their validators from cheap version lookups (see
+core.generations), so a 304 is answered before any serialization.
+"""
+import hashlib
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import APIException
+
+
+def make_etag(request, *parts):
+    """
+    Build an ETag from version parts plus everything else that changes
+    the body for the same URL: the query string and the negotiated
+    representation.
+    """
+    parts = [
+        *parts,
+        request.get_full_path(),
+        request.META.get("HTTP_ACCEPT", ""),
+    ]
+    digest = hashlib.md5(
+        "|".join(str(part) for part in parts).encode(),
+        usedforsecurity=False
+    )
+    return quote_etag(digest.hexdigest())
+
+
+def check_conditional(request, etag=None, last_modified=None):
+    """Return a 304/412 response if the request's validators match."""
+    if request.method not in ("GET", "HEAD"):
+        return None
+    timestamp = timegm(last_modified.utctimetuple()) \
+        if last_modified else None
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=timestamp
+    )
+
+
+def set_validators(response, etag=None, last_modified=None):
+    if response.status_code not in (200, 304):
+        return response
+    if etag and not response.has_header("ETag"):
+        response.headers["ETag"] = etag
+    if last_modified and not response.has_header("Last-Modified"):
+        response.headers["Last-Modified"] = http_date(
+            timegm(last_modified.utctimetuple())
+        )
+    return response
+
+
+class NotModified(APIException):
+    def __init__(self, response):
+        self.response = response
+        super().__init__()
+
+
+class ConditionalGetMixin:
+    """
+    Answer GET requests with 304 Not Modified when the client's ETag or
+    Last-Modified validators are still current. Views override
+    `get_etag()` / `get_last_modified()`; returning None disables the
+    check.
+    """
+
+    def get_etag(self, request):
+        return None
+
+    def get_last_modified(self, request):
+        return None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        self.etag = self.last_modified = None
+        if request.method not in ("GET", "HEAD"):
+            return
+
+        self.etag = self.get_etag(request)
+        self.last_modified = self.get_last_modified(request)
+        response = check_conditional(request, self.etag, self.last_modified)
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request,
+            response,
+            *args,
+            **kwargs
+        )
+        return set_validators(
+            response,
+            getattr(self, "etag", None),
+            getattr(self, "last_modified", None)
+        )
@@ -0,0 +1,60 @@
+"""
+Generation counters kept in the cache.
+
+A generation identifies the current state of a group of data (a model, a
+film, the whole catalog). Bumping it makes every cached value and HTTP
+validator derived from the old generation stale. Generations are
+nanosecond timestamps, so they also tell when the data last changed and a
+generation evicted from the cache never comes back with an old value.
+"""
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db import transaction
+
+GENERATION_KEY = "generation:{name}"
+
+
+def get_generation(name):
+    key = GENERATION_KEY.format(name=name)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def get_generations(*names):
+    keys = {GENERATION_KEY.format(name=name): name for name in names}
+    found = cache.get_many(list(keys))
+    return {
+        name: found.get(key) or get_generation(name)
+        for key, name in keys.items()
+    }
+
+
+def bump_generations(*names):
+    """
+    Bump the given generations now and again once the current
+    transaction commits, so values computed from uncommitted data by a
+    concurrent request do not outlive it.
+    """
+    if not names:
+        return
+
+    def bump():
+        now = time.time_ns()
+        keys = [GENERATION_KEY.format(name=name) for name in names]
+        current = cache.get_many(keys)
+        cache.set_many(
+            {key: max(now, current.get(key, 0) + 1) for key in keys},
+            timeout=None
+        )
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def generation_datetime(generation):
+    return datetime.fromtimestamp(generation / 1e9, tz=timezone.utc)
@@ -0,0 +1,192 @@
+"""
+Column projection for read endpoints.
+
+`ProjectionMixin` makes a view load only the columns its serializer
+outputs, following the queryset's `select_related()` joins and prefetched
+relations, so nobody has to keep `only()` lists in sync with serializers.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _readable_fields(serializer):
+    return [
+        field for field in serializer.fields.values()
+        if not field.write_only
+    ]
+
+
+def _get_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def _columns(model, serializer, selected, annotations=(), extra=()):
+    """
+    Return the `only()` paths of the columns `serializer` reads from
+    `model` and the `selected` select_related() tree, or None when a
+    field reads something that cannot be followed.
+    """
+    columns = {model._meta.pk.name}
+    columns.update(
+        name for name in extra
+        if getattr(_get_field(model, name), "concrete", False)
+    )
+
+    for field in _readable_fields(serializer):
+        # Method fields declare their columns through the view's
+        # `projection_fields`.
+        if isinstance(field, serializers.SerializerMethodField):
+            continue
+        if field.source == "*":
+            return None
+        name = field.source_attrs[0]
+        if name in annotations:
+            continue
+
+        model_field = _get_field(model, name)
+        if model_field is None:
+            # A property or a method may read any column.
+            return None
+        if model_field.many_to_many or model_field.one_to_many:
+            continue
+        columns.add(name)
+
+        if name in selected and isinstance(field, serializers.Serializer):
+            related = _columns(
+                model_field.related_model,
+                field,
+                selected[name]
+            )
+            if related is not None:
+                columns.update(f"{name}{LOOKUP_SEP}{path}" for path in related)
+
+    # Joined relations must be loaded even when nothing above reads them.
+    for name, nested in selected.items():
+        columns.add(name)
+        for path in _joined(nested):
+            columns.add(f"{name}{LOOKUP_SEP}{path}")
+    return columns
+
+
+def _joined(selected):
+    for name, nested in selected.items():
+        yield name
+        for path in _joined(nested):
+            yield f"{name}{LOOKUP_SEP}{path}"
+
+
+def _field_for(serializer, name):
+    for field in _readable_fields(serializer):
+        if field.source == name:
+            return field
+    return None
+
+
+def _prefetches(model, serializer, lookups):
+    """
+    Replace the prefetch lookups of relations `serializer` outputs with
+    `Prefetch` objects loading only the columns it reads.
+    """
+    grouped = {}
+    for lookup in lookups:
+        if isinstance(lookup, str):
+            name, _, rest = lookup.partition(LOOKUP_SEP)
+            base = None
+        elif lookup.to_attr is None \
+                and LOOKUP_SEP not in lookup.prefetch_to:
+            # A Prefetch of a direct relation narrowing its rows.
+            name, rest, base = lookup.prefetch_to, "", lookup.queryset
+        else:
+            name = None
+
+        field = _field_for(serializer, name) if name else None
+        relation = _get_field(model, name) if name else None
+        if field is None or relation is None \
+                or (name in grouped and base is not None):
+            grouped[lookup] = None
+            continue
+
+        group = grouped.setdefault(name, [field, relation, [], None])
+        if rest:
+            group[2].append(rest)
+        if base is not None:
+            group[3] = base
+
+    prefetches = []
+    for key, group in grouped.items():
+        if group is None:
+            prefetches.append(key)
+            continue
+
+        field, relation, rests, base = group
+        related = relation.related_model
+        if base is None:
+            base = related._default_manager.all()
+        queryset = base.prefetch_related(*rests)
+        # Reverse foreign keys are matched to their objects by the
+        # foreign key column.
+        extra = [relation.field.name] if relation.one_to_many else []
+
+        if isinstance(field, serializers.ListSerializer):
+            queryset = project(queryset, field.child, extra)
+        elif isinstance(field, serializers.ManyRelatedField) \
+                and isinstance(field.child_relation,
+                               serializers.PrimaryKeyRelatedField):
+            queryset = queryset.only(related._meta.pk.name, *extra)
+        prefetches.append(Prefetch(key, queryset=queryset))
+    return prefetches
+
+
+def project(queryset, serializer, extra=()):
+    """
+    Return `queryset` loading only the columns `serializer` reads, plus
+    the model fields named in `extra`.
+    """
+    model = queryset.model
+    query = queryset.query
+    lookups = queryset._prefetch_related_lookups
+
+    if lookups:
+        queryset = queryset.prefetch_related(None).prefetch_related(
+            *_prefetches(model, serializer, lookups)
+        )
+    if query.select_related is True:
+        return queryset
+
+    columns = _columns(
+        model,
+        serializer,
+        query.select_related or {},
+        annotations=set(query.annotations),
+        extra=extra
+    )
+    if columns is None:
+        return queryset
+    return queryset.only(*columns)
+
+
+class ProjectionMixin:
+    """
+    Load only the columns the serializer of a read request outputs.
+    Views list the other columns they read, e.g. for method fields or
+    keyset pagination, in `projection_fields`.
+    """
+
+    projection_fields = ()
+
+    def get_queryset(self):
+        return self.project_queryset(super().get_queryset())
+
+    def project_queryset(self, queryset, serializer=None):
+        request = getattr(self, "request", None)
+        if request is None or request.method not in SAFE_METHODS:
+            return queryset
+        if serializer is None:
+            serializer = self.get_serializer()
+        return project(queryset, serializer, self.projection_fields)
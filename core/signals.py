@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .generations import bump_generations
+from .models import SiteConfiguration
+
+
+@receiver(post_save, sender=SiteConfiguration)
+def bump_site_configuration_generation(sender, **kwargs):
+    bump_generations(sender._meta.label_lower)
@@ -8,6 +8,8 @@ from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
 from movie.permissions import IsAdminOrReadOnly
+from .conditional import ConditionalGetMixin, make_etag
+from .generations import generation_datetime, get_generation
 from .models import SiteConfiguration
 from .permissions import IsSuperUser
 from .serializers import (
@@ -64,9 +66,18 @@ class UserViewSet(ModelViewSet):
             )
 
 
-class SiteConfigurationView(APIView):
+class SiteConfigurationView(ConditionalGetMixin, APIView):
     permission_classes = [IsAdminOrReadOnly]
 
+    def get_etag(self, request):
+        return make_etag(request, self.get_generation())
+
+    def get_last_modified(self, request):
+        return generation_datetime(self.get_generation())
+
+    def get_generation(self):
+        return get_generation(SiteConfiguration._meta.label_lower)
+
     def get(self, request):
         config = SiteConfiguration.objects.first()
         serializer = SiteConfigurationSerializer(config)
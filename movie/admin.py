@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.contrib import admin
+from django.db import transaction
 from django.db.models import Count
 from django.urls import reverse
 from django.utils.html import format_html
@@ -7,6 +8,7 @@ from django.utils.http import urlencode
 from jalali_date import datetime2jalali
 from jalali_date.admin import ModelAdminJalaliMixin
 
+from .counters import refresh_comment_counts
 from .models import (
     Actor,
     Collection,
@@ -86,7 +88,7 @@ class FilmAdmin(ModelAdminJalaliMixin, admin.ModelAdmin):
         "get_user",
     ]
     list_editable = ["status"]
-    readonly_fields = ["user", "visit_count"]
+    readonly_fields = ["user", "visit_count", "comment_count"]
     search_fields = ["title", "title_en"]
     list_filter = [
         "status",
@@ -297,11 +299,19 @@ class CommentAdmin(admin.ModelAdmin):
 
     @admin.action(description="رد کردن")
     def make_rejected(self, request, queryset):
-        queryset.update(status=Comment.STATUS_REJECTED)
+        self._update_status(queryset, Comment.STATUS_REJECTED)
 
     @admin.action(description="تایید کردن")
     def make_approved(self, request, queryset):
-        queryset.update(status=Comment.STATUS_APPROVED)
+        self._update_status(queryset, Comment.STATUS_APPROVED)
+
+    def _update_status(self, queryset, status):
+        # queryset.update() skips the model signals, so recount the
+        # affected films in the same transaction.
+        with transaction.atomic():
+            film_ids = set(queryset.values_list("film_id", flat=True))
+            queryset.update(status=status)
+            refresh_comment_counts(film_ids)
 
     def save_model(self, request, obj, form, change):
         obj.user = request.user
@@ -5,3 +5,6 @@ class MovieConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'movie'
     verbose_name = 'فیلم'
+
+    def ready(self):
+        from . import signals  # noqa: F401
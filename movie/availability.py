@@ -0,0 +1,117 @@
+"""
+Link availability summaries stored on films.
+
+``Film.link_flags`` has one bit for every (subtitle, quality) pair present
+among the film's links and ``Film.min_link_size`` is the size of its
+smallest link, so the catalog can be filtered by link properties without
+joining the links table. Signals in movie.signals refresh them whenever
+links change. The flags are tested with a bitwise AND, which no index can
+serve, so ``link_flags`` is not indexed; the filter is checked on the
+film rows the other conditions leave.
+
+Bits follow the order of ``Link.SUBTITLE_CHOICES`` and
+``Link.QUALITY_CHOICES``; reordering those choices requires running the
+``refresh_link_summaries`` management command.
+
+``season_summaries()`` describes the seasons of serials, which film pages
+show instead of embedding every episode's links.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, F, Min
+from django.db.models.lookups import GreaterThan
+
+from .models import Film, Link
+
+SUBTITLES = [subtitle for subtitle, _ in Link.SUBTITLE_CHOICES]
+QUALITIES = [quality for quality, _ in Link.QUALITY_CHOICES]
+
+SUMMARY_BATCH_SIZE = 500
+
+
+def link_flag(subtitle, quality):
+    try:
+        index = SUBTITLES.index(subtitle) * len(QUALITIES) \
+            + QUALITIES.index(quality)
+    except ValueError:
+        return 0
+    return 1 << index
+
+
+def link_mask(subtitle=None, quality=None):
+    """
+    Bits of the pairs matching `subtitle` and `quality`; None matches
+    every value.
+    """
+    mask = 0
+    for link_subtitle in SUBTITLES:
+        for link_quality in QUALITIES:
+            if subtitle not in (None, link_subtitle) \
+                    or quality not in (None, link_quality):
+                continue
+            mask |= link_flag(link_subtitle, link_quality)
+    return mask
+
+
+def has_links(mask):
+    """Condition matching films with a link of one of the `mask` pairs."""
+    return GreaterThan(F("link_flags").bitand(mask), 0)
+
+
+def refresh_link_summaries(film_ids):
+    film_ids = sorted(set(film_ids) - {None})
+    for start in range(0, len(film_ids), SUMMARY_BATCH_SIZE):
+        chunk = film_ids[start:start + SUMMARY_BATCH_SIZE]
+        films = {
+            film_id: Film(pk=film_id, link_flags=0, min_link_size=None)
+            for film_id in chunk
+        }
+        rows = Link.objects.filter(film_id__in=chunk) \
+            .values("film_id", "subtitle", "quality") \
+            .annotate(min_size=Min("size")).order_by()
+
+        sizes = defaultdict(list)
+        for row in rows:
+            film = films[row["film_id"]]
+            film.link_flags |= link_flag(row["subtitle"], row["quality"])
+            sizes[film.pk].append(row["min_size"])
+        for film_id, film_sizes in sizes.items():
+            films[film_id].min_link_size = min(film_sizes)
+
+        Film.objects.bulk_update(
+            films.values(),
+            ["link_flags", "min_link_size"]
+        )
+
+
+def season_summaries(film_ids):
+    """
+    Return `{film_id: [{"season", "episode_count", "qualities"}, ...]}`
+    for the links of the given films that belong to a season.
+    """
+    links = Link.objects.filter(film_id__in=film_ids, season__isnull=False)
+    counts = links.values_list("film_id", "season") \
+        .annotate(episode_count=Count("episode", distinct=True)).order_by()
+    qualities = links.values_list("film_id", "season", "quality") \
+        .distinct().order_by()
+
+    seasons = defaultdict(dict)
+    for film_id, season, episode_count in counts:
+        seasons[film_id][season] = {
+            "season": season,
+            "episode_count": episode_count,
+            "qualities": [],
+        }
+    for film_id, season, quality in qualities:
+        seasons[film_id][season]["qualities"].append(quality)
+
+    for film_seasons in seasons.values():
+        for season in film_seasons.values():
+            season["qualities"].sort(
+                key=lambda quality: QUALITIES.index(quality)
+                if quality in QUALITIES else len(QUALITIES)
+            )
+    return {
+        film_id: [film_seasons[season] for season in sorted(film_seasons)]
+        for film_id, film_seasons in seasons.items()
+    }
@@ -0,0 +1,130 @@
+"""
+Helpers for writing many films at once.
+
+Bulk queries skip model signals, so code using them must call
+``films_changed()`` for the films it wrote to refresh what the signals in
+movie.signals would have kept in sync.
+"""
+from core.generations import bump_generations
+
+from .availability import refresh_link_summaries
+from .caching import invalidate_films
+from .film_index import refresh_film_index
+from .models import Film
+from .search import refresh_search_documents
+
+
+class NameLookup:
+    """
+    In-memory map from a natural key (a title or a name) to the id of a
+    model instance, creating missing instances in bulk.
+    """
+
+    def __init__(self, model, key_field, defaults=None):
+        self.model = model
+        self.key_field = key_field
+        self.defaults = defaults or (lambda key: {})
+        self.reload()
+        self.created = False
+
+    def reload(self):
+        """Re-read the map, e.g. after a rollback undid some creations."""
+        self.ids = dict(
+            self.model.objects.values_list(self.key_field, "pk")
+            .order_by("-pk")
+        )
+
+    def resolve(self, keys, extra=None):
+        """
+        Return `{key: id}` for `keys`, creating the missing ones with
+        `defaults(key)` updated by `extra.get(key, {})`.
+        """
+        extra = extra or {}
+        missing = {key for key in keys if key not in self.ids}
+        if missing:
+            instances = [
+                self.model(**{
+                    self.key_field: key,
+                    **self.defaults(key),
+                    **extra.get(key, {}),
+                })
+                for key in sorted(missing)
+            ]
+            for instance in self.model.objects.bulk_create(instances):
+                self.ids[getattr(instance, self.key_field)] = instance.pk
+            self.created = True
+        return {key: self.ids[key] for key in keys}
+
+    def bump_generation(self):
+        if self.created:
+            bump_generations(self.model._meta.label_lower)
+
+
+def sync_relations(through, source_field, target_field, wanted):
+    """
+    Make the rows of an M2M `through` table of every source in `wanted`
+    (`{source_id: {target_id, ...}}`) match it, inserting and deleting
+    only the differences. Return the ids of the sources that changed.
+    """
+    source_column = f"{source_field}_id"
+    target_column = f"{target_field}_id"
+    existing = {}
+    rows = through.objects.filter(**{f"{source_column}__in": list(wanted)}) \
+        .values_list("pk", source_column, target_column)
+    for pk, source_id, target_id in rows:
+        existing.setdefault(source_id, {})[target_id] = pk
+
+    stale = []
+    new_rows = []
+    changed = set()
+    for source_id, target_ids in wanted.items():
+        current = existing.get(source_id, {})
+        removed = [
+            pk for target_id, pk in current.items()
+            if target_id not in target_ids
+        ]
+        added = [
+            through(**{source_column: source_id, target_column: target_id})
+            for target_id in target_ids - set(current)
+        ]
+        if removed or added:
+            changed.add(source_id)
+        stale += removed
+        new_rows += added
+
+    if stale:
+        through.objects.filter(pk__in=stale).delete()
+    through.objects.bulk_create(new_rows, ignore_conflicts=True)
+    return changed
+
+
+def sync_film_relations(relations):
+    """
+    Make the M2M relations of films match `relations`
+    (`{film_id: {relation_name: {target_id, ...}}}`); relations missing
+    from a film's dict are left alone. Return the ids of changed films.
+    """
+    changed = set()
+    for field in Film._meta.many_to_many:
+        wanted = {
+            film_id: film_relations[field.name]
+            for film_id, film_relations in relations.items()
+            if field.name in film_relations
+        }
+        if wanted:
+            changed |= sync_relations(
+                field.remote_field.through,
+                field.m2m_field_name(),
+                field.m2m_reverse_field_name(),
+                wanted
+            )
+    return changed
+
+
+def films_changed(film_ids):
+    """Refresh the derived data of films written with bulk queries."""
+    film_ids = list(film_ids)
+    refresh_search_documents(film_ids)
+    refresh_link_summaries(film_ids)
+    invalidate_films(film_ids)
+    refresh_film_index(film_ids)
@@ -0,0 +1,75 @@
+"""
+Cached film detail payloads and catalog facets.
+
+Every film has its own generation (see core.generations); cached payloads
+are keyed by it, so invalidating a film is a single cache write and stale
+payloads simply expire. Signals in movie.signals invalidate a film
+whenever data shown on its page changes.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.generations import bump_generations, get_generation
+
+CATALOG_GENERATION = "catalog"
+FILM_DETAIL_KEY = "film:{film_id}:detail:{audience}:{version}"
+FILM_FACETS_KEY = "films:facets:{audience}:{version}:{params}"
+
+
+def film_generation(film_id):
+    return f"film:{film_id}"
+
+
+def get_film_version(film_id):
+    return get_generation(film_generation(film_id))
+
+
+def invalidate_films(film_ids):
+    """Invalidate the cached pages of the given films and the catalog."""
+    film_ids = {film_id for film_id in film_ids if film_id is not None}
+    if film_ids:
+        bump_generations(
+            CATALOG_GENERATION,
+            *[film_generation(film_id) for film_id in film_ids]
+        )
+
+
+def get_cached_film_detail(film_id, is_staff, build, version=None):
+    """
+    Return the cached detail payload of a film, building and storing it
+    with `build()` on a miss. `visit_count` is never cached.
+    """
+    key = FILM_DETAIL_KEY.format(
+        film_id=film_id,
+        audience="staff" if is_staff else "public",
+        version=version or get_film_version(film_id),
+    )
+    data = cache.get(key)
+    if data is None:
+        data = dict(build())
+        data.pop("visit_count", None)
+        cache.set(key, data, timeout=settings.FILM_DETAIL_CACHE_TIMEOUT)
+    return data
+
+
+def get_cached_facets(params, is_staff, build, version=None):
+    """
+    Return the cached facets of a filter combination (a list of
+    `(name, value)` pairs), computing them with `build()` on a miss.
+    """
+    digest = hashlib.md5(
+        repr(sorted(params)).encode(),
+        usedforsecurity=False
+    ).hexdigest()
+    key = FILM_FACETS_KEY.format(
+        audience="staff" if is_staff else "public",
+        version=version or get_generation(CATALOG_GENERATION),
+        params=digest,
+    )
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, timeout=settings.FILM_FACETS_CACHE_TIMEOUT)
+    return data
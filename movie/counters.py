@@ -0,0 +1,40 @@
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .caching import invalidate_films
+from .models import Comment, Film
+
+
+def approved_comment_count():
+    """Subquery counting the approved comments of the outer film."""
+    approved = Comment.objects.filter(
+        film_id=OuterRef("pk"),
+        status=Comment.STATUS_APPROVED
+    ).order_by().values("film_id").annotate(count=Count("pk")).values("count")
+    return Coalesce(Subquery(approved), Value(0))
+
+
+def adjust_comment_count(film_id, delta):
+    if delta:
+        Film.objects.filter(pk=film_id).update(
+            comment_count=Greatest(F("comment_count") + delta, Value(0))
+        )
+        invalidate_films([film_id])
+
+
+def refresh_comment_counts(film_ids=None):
+    """
+    Recompute the stored approved-comment count of the given films (or of
+    every film whose counter has drifted) and return the number of rows
+    that were updated.
+    """
+    if film_ids is None:
+        film_ids = Film.objects.annotate(actual=approved_comment_count()) \
+            .exclude(comment_count=F("actual")) \
+            .values_list("pk", flat=True)
+    film_ids = list(film_ids)
+
+    updated = Film.objects.filter(pk__in=film_ids) \
+        .update(comment_count=approved_comment_count())
+    invalidate_films(film_ids)
+    return updated
@@ -0,0 +1,118 @@
+"""
+Streaming catalog export in the format read by the import_catalog command.
+
+Films are read with ``.iterator(chunk_size=...)``; relations are
+prefetched for one chunk at a time, so memory does not grow with the
+size of the catalog.
+"""
+import csv
+import json
+
+from django.conf import settings
+
+CSV_COLUMNS = [
+    "title",
+    "title_en",
+    "year",
+    "description",
+    "imdb_rating",
+    "imdb_link",
+    "is_serial",
+    "duration",
+    "status",
+    "director",
+    "actors",
+    "genres",
+    "countries",
+    "original_languages",
+    "collections",
+    "links",
+]
+LIST_SEPARATOR = "|"
+
+
+def _person(person):
+    return {"full_name": person.full_name, "full_name_en": person.full_name_en}
+
+
+def film_record(film):
+    return {
+        "id": film.pk,
+        "title": film.title,
+        "title_en": film.title_en,
+        "year": film.year,
+        "description": film.description,
+        "imdb_rating": film.imdb_rating,
+        "imdb_link": film.imdb_link,
+        "is_serial": film.is_serial,
+        "duration": film.duration,
+        "status": film.status,
+        "director": _person(film.director),
+        "actors": [_person(actor) for actor in film.actors.all()],
+        "genres": [genre.title for genre in film.genres.all()],
+        "countries": [country.title for country in film.countries.all()],
+        "original_languages": [
+            language.title for language in film.original_languages.all()
+        ],
+        "collections": [
+            collection.title for collection in film.collections.all()
+        ],
+        "links": [
+            {
+                "url": link.url,
+                "size": link.size,
+                "quality": link.quality,
+                "subtitle": link.subtitle,
+                "season": link.season,
+                "episode": link.episode,
+                "languages": [
+                    language.title for language in link.languages.all()
+                ],
+            }
+            for link in film.links.all()
+        ],
+    }
+
+
+def export_queryset(queryset):
+    return queryset.select_related("director").prefetch_related(
+        "actors",
+        "genres",
+        "countries",
+        "original_languages",
+        "collections",
+        "links__languages",
+    ).order_by("pk")
+
+
+def iter_records(queryset):
+    chunk_size = settings.FILM_EXPORT_CHUNK_SIZE
+    for film in export_queryset(queryset).iterator(chunk_size=chunk_size):
+        yield film_record(film)
+
+
+def iter_ndjson(queryset):
+    for record in iter_records(queryset):
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+class _Echo:
+    """File-like object handing written CSV rows back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for record in iter_records(queryset):
+        record["director"] = record["director"]["full_name_en"]
+        record["actors"] = [
+            actor["full_name_en"] for actor in record["actors"]
+        ]
+        for column in ["actors", "genres", "countries",
+                       "original_languages", "collections"]:
+            record[column] = LIST_SEPARATOR.join(record[column])
+        record["links"] = json.dumps(record["links"], ensure_ascii=False)
+        yield writer.writerow([record[column] for column in CSV_COLUMNS])
@@ -0,0 +1,68 @@
+"""
+Faceted counts for the catalog filter sidebar.
+
+All relation facets are counted by one UNION of grouped queries over the
+M2M through tables; decades and `is_serial` by one grouped query over
+films.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, F, IntegerField, Value
+from django.db.models.functions import Cast
+
+from .models import Film
+
+RELATION_FACETS = {
+    "genres": "genre",
+    "countries": "country",
+    "original_languages": "language",
+    "collections": "collection",
+}
+
+
+def film_facets(queryset):
+    """Return facet counts of the films in `queryset`."""
+    film_ids = queryset.order_by().values("pk")
+
+    facets = {"count": 0, **{name: [] for name in RELATION_FACETS}}
+    facets.update(decades=[], is_serial=[])
+
+    counts = None
+    for name, target in RELATION_FACETS.items():
+        through = getattr(Film, name).through
+        facet = through.objects.filter(film_id__in=film_ids).values(
+            facet=Value(name),
+            key=F(f"{target}_id"),
+            title=F(f"{target}__title"),
+        ).annotate(count=Count("film_id")).order_by()
+        counts = facet if counts is None else counts.union(facet, all=True)
+
+    for row in counts:
+        facets[row["facet"]].append({
+            "id": row["key"],
+            "title": row["title"],
+            "count": row["count"],
+        })
+    for name in RELATION_FACETS:
+        facets[name].sort(key=lambda item: (-item["count"], item["id"]))
+
+    decades = defaultdict(int)
+    serials = defaultdict(int)
+    rows = Film.objects.filter(pk__in=film_ids).values(
+        "is_serial",
+        decade=Cast(F("year") / 10, IntegerField()) * 10,
+    ).annotate(count=Count("pk")).order_by()
+    for row in rows:
+        decades[row["decade"]] += row["count"]
+        serials[row["is_serial"]] += row["count"]
+        facets["count"] += row["count"]
+
+    facets["decades"] = [
+        {"decade": decade, "count": count}
+        for decade, count in sorted(decades.items(), reverse=True)
+    ]
+    facets["is_serial"] = [
+        {"value": value, "count": count}
+        for value, count in sorted(serials.items())
+    ]
+    return facets
@@ -0,0 +1,86 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+INVALID_KEY_ERRORS = (
+    TypeError,
+    ValueError,
+    DjangoValidationError,
+    serializers.ValidationError,
+)
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """A many-related field resolving all of its input at once."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+        return self.child_relation.to_internal_value_many(list(data))
+
+    def preload(self, values):
+        self.child_relation.preload([
+            value for items in values
+            if isinstance(items, (list, tuple))
+            for value in items
+        ])
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    A PrimaryKeyRelatedField that, with `many=True`, looks up all the
+    submitted ids with a single query instead of one query per id.
+
+    List serializers validating many items can `preload()` the ids of all
+    of them, so the items are then resolved without any query.
+    """
+
+    preloaded = None
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def preload(self, values):
+        keys = set()
+        for value in values:
+            try:
+                keys.add(self.to_key(value))
+            except INVALID_KEY_ERRORS:
+                continue
+        self.preloaded = self.get_queryset().in_bulk(keys) if keys else {}
+
+    def to_key(self, value):
+        if self.pk_field is not None:
+            value = self.pk_field.to_internal_value(value)
+        if isinstance(value, bool):
+            raise TypeError(value)
+        return self.get_queryset().model._meta.pk.to_python(value)
+
+    def to_internal_value(self, data):
+        if self.preloaded is None:
+            return super().to_internal_value(data)
+        return self.to_internal_value_many([data])[0]
+
+    def to_internal_value_many(self, data):
+        keys = []
+        for value in data:
+            try:
+                keys.append(self.to_key(value))
+            except INVALID_KEY_ERRORS:
+                self.fail("incorrect_type", data_type=type(value).__name__)
+
+        if self.preloaded is not None:
+            objects = self.preloaded
+        else:
+            objects = self.get_queryset().in_bulk(set(keys)) if keys else {}
+        for value, key in zip(data, keys):
+            if key not in objects:
+                self.fail("does_not_exist", pk_value=value)
+        return [objects[key] for key in keys]
@@ -0,0 +1,243 @@
+"""
+Process-local inverted index of published films by facet.
+
+For every facet value (a genre, country, actor, ...) the index keeps a
+sorted ``array`` of the ids of published films that have it, so any
+combination of facets resolves to a list of film ids by intersecting
+arrays in memory instead of joining through tables in SQL.
+
+Changes made by this process are applied incrementally once their
+transaction commits (see movie.signals); the whole index is rebuilt, by
+one request at a time, after ``FILM_INDEX["TTL"]`` seconds to pick up
+changes made by other processes. ``FilmIndex.version`` changes whenever
+the index does, so list validators of facet queries follow it.
+An index that would hold more than ``FILM_INDEX["MAX_ENTRIES"]`` postings
+is not kept and filtering falls back to SQL.
+"""
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+
+from .models import Film
+
+logger = logging.getLogger(__name__)
+
+FACETS = {
+    "genres": "genre_id",
+    "countries": "country_id",
+    "original_languages": "language_id",
+    "collections": "collection_id",
+    "actors": "actor_id",
+}
+
+
+def _contains(ids, film_id):
+    position = bisect_left(ids, film_id)
+    return position < len(ids) and ids[position] == film_id
+
+
+def intersect(posting_lists):
+    """Intersect sorted id arrays, starting from the shortest one."""
+    posting_lists = sorted(posting_lists, key=len)
+    result = posting_lists[0]
+    for ids in posting_lists[1:]:
+        if not result:
+            break
+        if len(result) * max(len(ids).bit_length(), 1) < len(ids):
+            # Few candidates left: binary search them in the long list.
+            result = [
+                film_id for film_id in result if _contains(ids, film_id)
+            ]
+        else:
+            result = sorted(set(result).intersection(ids))
+    return list(result)
+
+
+class FilmIndex:
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._postings = None
+        # {facet: {film_id: sorted array of value ids}}, used to remove a
+        # film's old postings when it changes.
+        self._film_values = {facet: {} for facet in FACETS}
+        self._built_at = None
+        # Films changed while a build was reading the database.
+        self._changed_during_build = None
+        self.version = None
+
+    @property
+    def is_built(self):
+        return self._postings is not None
+
+    def is_stale(self):
+        return self._built_at is None or (
+            self.ttl is not None
+            and time.monotonic() - self._built_at >= self.ttl
+        )
+
+    def ensure_fresh(self):
+        """
+        Rebuild a stale index. Only one thread rebuilds at a time; the
+        others keep using the previous index, or fall back to SQL until
+        the first build is done.
+        """
+        if not self.is_stale() \
+                or not self._build_lock.acquire(blocking=False):
+            return
+        try:
+            if self.is_stale():
+                self.build()
+        finally:
+            self._build_lock.release()
+
+    def build(self):
+        with self._lock:
+            self._changed_during_build = set()
+
+        postings = {facet: {} for facet in FACETS}
+        film_values = {facet: {} for facet in FACETS}
+        entries = 0
+        published = Film.objects.filter(status=Film.STATUS_PUBLISHED)
+
+        for facet, column in FACETS.items():
+            rows = getattr(Film, facet).through.objects \
+                .filter(film__in=published) \
+                .values_list(column, "film_id") \
+                .order_by(column, "film_id")
+            for value, film_id in rows.iterator(chunk_size=10000):
+                postings[facet].setdefault(value, array("I")).append(film_id)
+                # Rows come ordered by value, so these arrays stay sorted.
+                film_values[facet].setdefault(film_id, array("I")) \
+                    .append(value)
+                entries += 1
+                if self.max_entries is not None \
+                        and entries > self.max_entries:
+                    logger.warning(
+                        "Film index exceeds %s entries; disabled.",
+                        self.max_entries
+                    )
+                    postings = None
+                    film_values = {facet: {} for facet in FACETS}
+                    break
+            if postings is None:
+                break
+
+        with self._lock:
+            self._postings = postings
+            self._film_values = film_values
+            self._built_at = time.monotonic()
+            self.version = time.time_ns()
+            changed = self._changed_during_build
+            self._changed_during_build = None
+        if changed:
+            self.refresh_films(changed)
+
+    def refresh_films(self, film_ids):
+        """Re-read the facets of the given films into a built index."""
+        film_ids = set(film_ids) - {None}
+        with self._lock:
+            if self._changed_during_build is not None:
+                self._changed_during_build.update(film_ids)
+        if not self.is_built:
+            return
+        published = set(
+            Film.objects.filter(
+                pk__in=film_ids,
+                status=Film.STATUS_PUBLISHED
+            ).values_list("pk", flat=True)
+        )
+        values = {film_id: {} for film_id in published}
+        for facet, column in FACETS.items():
+            rows = getattr(Film, facet).through.objects \
+                .filter(film_id__in=published) \
+                .values_list("film_id", column)
+            for film_id, value in rows:
+                values[film_id].setdefault(facet, set()).add(value)
+
+        with self._lock:
+            if self._postings is None:
+                return
+            for film_id in film_ids:
+                self._replace(film_id, values.get(film_id, {}))
+            self.version = time.time_ns()
+
+    def _replace(self, film_id, new_values):
+        for facet in FACETS:
+            film_values = self._film_values[facet]
+            old = set(film_values.pop(film_id, ()))
+            new = new_values.get(facet, set())
+            postings = self._postings[facet]
+            for value in old - new:
+                ids = postings[value]
+                position = bisect_left(ids, film_id)
+                if position < len(ids) and ids[position] == film_id:
+                    ids.pop(position)
+                if not ids:
+                    del postings[value]
+            for value in new - old:
+                ids = postings.setdefault(value, array("I"))
+                position = bisect_left(ids, film_id)
+                if position == len(ids) or ids[position] != film_id:
+                    ids.insert(position, film_id)
+            if new:
+                film_values[film_id] = array("I", sorted(new))
+
+    def lookup(self, facets):
+        """
+        Return the sorted ids of published films having, for every
+        `{facet: value_ids}`, at least one of the values; or None if the
+        index cannot answer.
+        """
+        self.ensure_fresh()
+        with self._lock:
+            if self._postings is None:
+                return None
+            empty = array("I")
+            posting_lists = []
+            for facet, values in facets.items():
+                postings = [
+                    self._postings[facet].get(value, empty)
+                    for value in set(values)
+                ]
+                if len(postings) == 1:
+                    posting_lists.append(postings[0])
+                else:
+                    posting_lists.append(sorted(set().union(*postings)))
+            return intersect(posting_lists)
+
+
+def refresh_film_index(film_ids):
+    """Refresh the given films in this process' index after commit."""
+    index = get_film_index()
+    if index is None:
+        return
+    film_ids = list(film_ids)
+    transaction.on_commit(lambda: index.refresh_films(film_ids))
+
+
+@lru_cache(maxsize=None)
+def get_film_index():
+    config = settings.FILM_INDEX
+    if not config.get("ENABLED", True):
+        return None
+    return FilmIndex(
+        ttl=config.get("TTL"),
+        max_entries=config.get("MAX_ENTRIES")
+    )
+
+
+@receiver(setting_changed)
+def reset_film_index(setting, **kwargs):
+    if setting == "FILM_INDEX":
+        get_film_index.cache_clear()
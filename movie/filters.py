@@ -1,10 +1,65 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django_filters import rest_framework as filters
 
+from .availability import has_links, link_mask
+from .film_index import FACETS, get_film_index
 from .models import Film, Link, Comment
 
 
 class FilmFilter(filters.FilterSet):
+    subtitle = filters.ChoiceFilter(
+        choices=Link.SUBTITLE_CHOICES,
+        method="filter_links"
+    )
+    quality = filters.ChoiceFilter(
+        choices=Link.QUALITY_CHOICES,
+        method="filter_links"
+    )
+    max_size = filters.NumberFilter(
+        field_name="min_link_size",
+        lookup_expr="lte"
+    )
+
+    def filter_links(self, queryset, name, value):
+        # `subtitle` and `quality` must match the same link, so both are
+        # checked against the film's link flags at once.
+        mask = link_mask(
+            subtitle=self.form.cleaned_data.get("subtitle") or None,
+            quality=self.form.cleaned_data.get("quality") or None,
+        )
+        return queryset.filter(has_links(mask))
+
+    def filter_queryset(self, queryset):
+        # The public catalog resolves M2M facets from the in-memory film
+        # index instead of joining each through table.
+        facets = {
+            name: [value.pk for value in self.form.cleaned_data[name]]
+            for name in FACETS
+            if self.form.cleaned_data.get(name)
+        }
+        index = get_film_index()
+        is_staff = self.request is not None and self.request.user.is_staff
+        if not facets or index is None or is_staff:
+            return super().filter_queryset(queryset)
+
+        film_ids = index.lookup(facets)
+        max_results = settings.FILM_INDEX.get("MAX_RESULTS")
+        if film_ids is None \
+                or max_results is not None and len(film_ids) > max_results:
+            return super().filter_queryset(queryset)
+
+        cleaned_data = self.form.cleaned_data
+        self.form.cleaned_data = {
+            name: value for name, value in cleaned_data.items()
+            if name not in facets
+        }
+        try:
+            queryset = super().filter_queryset(queryset)
+        finally:
+            self.form.cleaned_data = cleaned_data
+        return queryset.filter(pk__in=film_ids)
+
     class Meta:
         model = Film
         fields = {
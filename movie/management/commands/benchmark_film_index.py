@@ -0,0 +1,94 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from movie.film_index import FACETS, FilmIndex
+from movie.models import Film
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare resolving facet combinations with the in-memory film "
+        "index against the ORM joins."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=200)
+        parser.add_argument("--max-facets", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        started = time.perf_counter()
+        index = FilmIndex()
+        index.build()
+        build_time = time.perf_counter() - started
+        if not index.is_built:
+            self.stderr.write("The film index could not be built.")
+            return
+
+        combinations = self.sample_combinations(
+            rng,
+            options["runs"],
+            options["max_facets"]
+        )
+        if not combinations:
+            self.stderr.write("No published films with facets to sample.")
+            return
+
+        orm_times, index_times = [], []
+        for facets in combinations:
+            queryset = Film.objects.filter(status=Film.STATUS_PUBLISHED)
+            for facet, values in facets.items():
+                queryset = queryset.filter(**{f"{facet}__in": values})
+
+            started = time.perf_counter()
+            expected = sorted(
+                queryset.values_list("pk", flat=True).distinct()
+            )
+            orm_times.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            found = index.lookup(facets)
+            index_times.append(time.perf_counter() - started)
+
+            if found != expected:
+                self.stderr.write(f"Mismatch for {facets}.")
+
+        self.stdout.write(f"Index build: {build_time * 1000:.1f} ms")
+        self.report("ORM", orm_times)
+        self.report("Index", index_times)
+
+    def sample_combinations(self, rng, runs, max_facets):
+        film_ids = list(
+            Film.objects.filter(status=Film.STATUS_PUBLISHED)
+            .values_list("pk", flat=True)
+        )
+        combinations = []
+        for film_id in rng.sample(film_ids, min(runs, len(film_ids))):
+            values = [
+                (facet, value)
+                for facet, column in FACETS.items()
+                for value in getattr(Film, facet).through.objects
+                .filter(film_id=film_id).values_list(column, flat=True)
+            ]
+            if values:
+                picked = rng.sample(values, rng.randint(
+                    1,
+                    min(max_facets, len(values))
+                ))
+                facets = {}
+                for facet, value in picked:
+                    facets.setdefault(facet, []).append(value)
+                combinations.append(facets)
+        return combinations
+
+    def report(self, name, timings):
+        self.stdout.write(
+            f"{name}: median {statistics.median(timings) * 1000:.3f} ms, "
+            f"mean {statistics.mean(timings) * 1000:.3f} ms "
+            f"over {len(timings)} runs"
+        )
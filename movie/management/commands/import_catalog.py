@@ -0,0 +1,414 @@
+import csv
+import json
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from movie.bulk import films_changed, NameLookup, sync_relations
+from movie.models import (
+    Actor,
+    Collection,
+    Country,
+    Director,
+    Film,
+    Genre,
+    Language,
+    Link,
+)
+
+FILM_FIELDS = [
+    "title",
+    "title_en",
+    "year",
+    "description",
+    "imdb_rating",
+    "imdb_link",
+    "is_serial",
+    "duration",
+    "status",
+]
+TITLE_RELATIONS = {
+    "genres": ("genre", Genre),
+    "countries": ("country", Country),
+    "original_languages": ("language", Language),
+    "collections": ("collection", Collection),
+}
+LINK_FIELDS = ["size", "quality", "subtitle", "season", "episode"]
+LIST_SEPARATOR = "|"
+
+
+def _person(value):
+    """Return `(full_name_en, full_name)` of a name or a name object."""
+    if isinstance(value, dict):
+        full_name_en = value.get("full_name_en") or value.get("full_name")
+        return full_name_en, value.get("full_name") or full_name_en
+    return value, value
+
+
+def _integer(value):
+    return int(value) if value not in (None, "") else None
+
+
+def _boolean(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def _validate(model, values):
+    """Check `values` against the validators of `model`'s fields."""
+    for name, value in values.items():
+        try:
+            model._meta.get_field(name).clean(value, None)
+        except ValidationError as error:
+            raise ValueError(f"invalid {name}: {' '.join(error.messages)}")
+
+
+def parse_film(record):
+    """Validate an input record and return it in a normalized form."""
+    if "_error" in record:
+        raise ValueError(record["_error"])
+    missing = [
+        field for field in
+        ("title", "title_en", "year", "imdb_rating", "imdb_link",
+         "director")
+        if record.get(field) in (None, "")
+    ]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+    film = {
+        "title": record["title"],
+        "title_en": record["title_en"],
+        "year": int(record["year"]),
+        "description": record.get("description") or "",
+        "imdb_rating": float(record["imdb_rating"]),
+        "imdb_link": record["imdb_link"],
+        "is_serial": _boolean(record.get("is_serial", False)),
+        "duration": int(record["duration"])
+        if record.get("duration") not in (None, "") else None,
+        "status": record.get("status") or Film.STATUS_PUBLISHED,
+    }
+    # Imported films may come without a description.
+    _validate(Film, {
+        field: value for field, value in film.items()
+        if field != "description"
+    })
+
+    relations = {
+        name: list(dict.fromkeys(record.get(name) or []))
+        for name in TITLE_RELATIONS
+    }
+    for name, (_, model) in TITLE_RELATIONS.items():
+        for title in relations[name]:
+            _validate(model, {"title": title})
+    links = []
+    for link in record.get("links") or []:
+        if not link.get("url") or link.get("size") in (None, ""):
+            raise ValueError("links need a url and a size")
+        links.append({
+            "url": link["url"],
+            "size": int(link["size"]),
+            "quality": link.get("quality") or Link.QUALITY_720P,
+            "subtitle": link.get("subtitle") or Link.SUBTITLE_NO_SUB,
+            "season": _integer(link.get("season")),
+            "episode": _integer(link.get("episode")),
+            "languages": list(dict.fromkeys(link.get("languages") or [])),
+        })
+        _validate(Link, {
+            field: value for field, value in links[-1].items()
+            if field != "languages"
+        })
+        for title in links[-1]["languages"]:
+            _validate(Language, {"title": title})
+    episodes = [
+        (link["season"], link["episode"], link["quality"], link["subtitle"])
+        for link in links
+        if link["season"] is not None and link["episode"] is not None
+    ]
+    if len(episodes) != len(set(episodes)):
+        raise ValueError("duplicate episode links")
+    director = _person(record["director"])
+    actors = list(dict.fromkeys(
+        _person(actor) for actor in record.get("actors") or []
+    ))
+    for model, people in [(Director, [director]), (Actor, actors)]:
+        for full_name_en, full_name in people:
+            _validate(model, {
+                "full_name": full_name,
+                "full_name_en": full_name_en,
+            })
+    return {
+        "film": film,
+        "director": director,
+        "actors": actors,
+        "relations": relations,
+        "links": links,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Import films with their directors, actors, genres, countries, "
+        "languages, collections and links from a JSONL or CSV file. Films "
+        "are matched by imdb_link, so rerunning an import updates them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=["jsonl", "csv"],
+            help="Defaults to the file extension."
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--user",
+            help="Username recorded as the films' creator; defaults to "
+                 "the first superuser."
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options["user"])
+        file_format = options["format"] or (
+            "csv" if options["path"].endswith(".csv") else "jsonl"
+        )
+
+        self.directors = NameLookup(Director, "full_name_en")
+        self.actors = NameLookup(Actor, "full_name_en")
+        self.titles = {
+            name: NameLookup(model, "title")
+            for name, (_, model) in TITLE_RELATIONS.items()
+        }
+        self.titles["languages"] = self.titles["original_languages"]
+
+        imported = failed = 0
+        with open(options["path"], encoding="utf-8", newline="") as file:
+            records = self.read_records(file, file_format)
+            while batch := list(islice(records, options["batch_size"])):
+                films = []
+                for line, record in batch:
+                    try:
+                        films.append(parse_film(record))
+                    except (ValueError, TypeError, AttributeError) as error:
+                        failed += 1
+                        self.stderr.write(f"Line {line}: {error}")
+                if not films:
+                    continue
+                try:
+                    with transaction.atomic():
+                        imported += self.import_batch(films, user)
+                except DatabaseError as error:
+                    # The whole batch was rolled back; keep importing the
+                    # next ones.
+                    failed += len(films)
+                    self.stderr.write(
+                        f"Lines {batch[0][0]}-{batch[-1][0]}: {error}"
+                    )
+                    for lookup in self.lookups():
+                        lookup.reload()
+
+        for lookup in self.lookups():
+            lookup.bump_generation()
+        self.stdout.write(self.style.SUCCESS(
+            f"{imported} film(s) imported, {failed} row(s) skipped."
+        ))
+
+    def lookups(self):
+        return [self.directors, self.actors, *self.titles.values()]
+
+    def get_user(self, username):
+        users = get_user_model().objects
+        if username:
+            user = users.filter(username=username).first()
+        else:
+            user = users.filter(is_superuser=True).order_by("pk").first()
+        if user is None:
+            raise CommandError("No user to record as the films' creator.")
+        return user
+
+    def read_records(self, file, file_format):
+        """Yield `(line_number, record)` pairs without reading ahead."""
+        if file_format == "jsonl":
+            for line, text in enumerate(file, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    yield line, json.loads(text)
+                except json.JSONDecodeError as error:
+                    yield line, {"_error": error}
+            return
+
+        reader = csv.DictReader(file)
+        for row in reader:
+            record = dict(row)
+            for name in ["actors", *TITLE_RELATIONS]:
+                record[name] = [
+                    item.strip()
+                    for item in (record.get(name) or "").split(LIST_SEPARATOR)
+                    if item.strip()
+                ]
+            try:
+                record["links"] = json.loads(record.get("links") or "[]")
+            except json.JSONDecodeError as error:
+                record = {"_error": error}
+            yield reader.line_num, record
+
+    def import_batch(self, records, user):
+        # Later rows win over earlier rows for the same film.
+        records = list({
+            record["film"]["imdb_link"]: record for record in records
+        }.values())
+
+        directors = self.directors.resolve(
+            {record["director"][0] for record in records},
+            extra={
+                full_name_en: {"full_name": full_name}
+                for record in records
+                for full_name_en, full_name in [record["director"]]
+            }
+        )
+        actors = self.actors.resolve(
+            {actor[0] for record in records for actor in record["actors"]},
+            extra={
+                full_name_en: {"full_name": full_name}
+                for record in records
+                for full_name_en, full_name in record["actors"]
+            }
+        )
+        titles = {
+            name: lookup.resolve({
+                title
+                for record in records
+                for title in (
+                    record["relations"][name] if name in TITLE_RELATIONS
+                    else [t for link in record["links"]
+                          for t in link["languages"]]
+                )
+            })
+            for name, lookup in self.titles.items()
+        }
+
+        films, changed = self.upsert_films(records, directors, user)
+
+        changed |= sync_relations(Film.actors.through, "film", "actor", {
+            film.pk: {actors[actor[0]] for actor in record["actors"]}
+            for film, record in zip(films, records)
+        })
+        for name, (target, _) in TITLE_RELATIONS.items():
+            changed |= sync_relations(
+                getattr(Film, name).through,
+                "film",
+                target,
+                {
+                    film.pk: {
+                        titles[name][title]
+                        for title in record["relations"][name]
+                    }
+                    for film, record in zip(films, records)
+                }
+            )
+
+        changed |= self.upsert_links(films, records, titles["languages"])
+        # Rerunning an unchanged import writes nothing.
+        films_changed(changed)
+        return len(films)
+
+    def upsert_films(self, records, directors, user):
+        """Create or update films; return them and the changed ids."""
+        fields = [*FILM_FIELDS, "director_id"]
+        key_index = fields.index("imdb_link")
+        existing = {
+            values[key_index]: (pk, values)
+            for pk, *values in Film.objects.filter(
+                imdb_link__in=[record["film"]["imdb_link"]
+                               for record in records]
+            ).order_by("-pk").values_list("pk", *fields)
+        }
+        now = timezone.now()
+        films, new_films, updated_films = [], [], []
+        for record in records:
+            film = Film(
+                **record["film"],
+                director_id=directors[record["director"][0]],
+                user=user,
+                last_update_date=now,
+            )
+            film.pk, stored = existing.get(film.imdb_link, (None, None))
+            if film.pk is None:
+                new_films.append(film)
+            elif stored != [getattr(film, field) for field in fields]:
+                updated_films.append(film)
+            films.append(film)
+
+        Film.objects.bulk_create(new_films)
+        Film.objects.bulk_update(
+            updated_films,
+            [*fields, "last_update_date"]
+        )
+        return films, {film.pk for film in new_films + updated_films}
+
+    def upsert_links(self, films, records, languages):
+        """
+        Create or update links; return the ids of changed films. Episode
+        links are matched by their film, season, episode, quality and
+        subtitle, which are unique, so a new url updates the link; other
+        links are matched by url.
+        """
+        existing = {}
+        for pk, film_id, url, *values in Link.objects.filter(
+            film_id__in=[film.pk for film in films]
+        ).values_list("pk", "film_id", "url", *LINK_FIELDS):
+            link = dict(zip(LINK_FIELDS, values), url=url)
+            existing[self.link_key(film_id, link)] = (pk, link)
+
+        new_links, updated_links, link_languages = [], [], []
+        for film, record in zip(films, records):
+            for data in record["links"]:
+                link = Link(
+                    film_id=film.pk,
+                    url=data["url"],
+                    **{field: data[field] for field in LINK_FIELDS}
+                )
+                link.pk, stored = existing.get(
+                    self.link_key(film.pk, data),
+                    (None, None)
+                )
+                if link.pk is None:
+                    new_links.append(link)
+                elif any(stored[field] != data[field]
+                         for field in ["url", *LINK_FIELDS]):
+                    updated_links.append(link)
+                link_languages.append((link, data["languages"]))
+
+        Link.objects.bulk_create(new_links)
+        Link.objects.bulk_update(updated_links, ["url", *LINK_FIELDS])
+        changed_links = sync_relations(
+            Link.languages.through,
+            "link",
+            "language",
+            {
+                link.pk: {languages[title] for title in titles}
+                for link, titles in link_languages
+            }
+        )
+        film_of_link = {link.pk: link.film_id for link, _ in link_languages}
+        return {
+            link.film_id for link in new_links + updated_links
+        } | {film_of_link[link_id] for link_id in changed_links}
+
+    @staticmethod
+    def link_key(film_id, link):
+        if link["season"] is not None and link["episode"] is not None:
+            return (
+                film_id,
+                link["season"],
+                link["episode"],
+                link["quality"],
+                link["subtitle"],
+            )
+        return film_id, link["url"]
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from movie.counters import refresh_comment_counts
+
+
+class Command(BaseCommand):
+    help = "Repair films whose stored approved-comment count has drifted."
+
+    def handle(self, *args, **options):
+        repaired = refresh_comment_counts()
+        self.stdout.write(
+            self.style.SUCCESS(f"{repaired} film(s) repaired.")
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from movie.availability import refresh_link_summaries
+from movie.models import Film
+
+
+class Command(BaseCommand):
+    help = "Recompute the link availability summaries of every film."
+
+    def handle(self, *args, **options):
+        film_ids = list(Film.objects.values_list("pk", flat=True))
+        refresh_link_summaries(film_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(film_ids)} film(s) refreshed.")
+        )
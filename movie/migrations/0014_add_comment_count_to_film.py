@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-18 02:48
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_comment_count(apps, schema_editor):
+    Film = apps.get_model('movie', 'Film')
+    Comment = apps.get_model('movie', 'Comment')
+
+    approved = Comment.objects.filter(
+        film_id=OuterRef('pk'),
+        status='A',
+    ).order_by().values('film_id').annotate(count=Count('pk')).values('count')
+    Film.objects.update(
+        comment_count=Coalesce(Subquery(approved), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0013_make_comment_rating_field_optional'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='film',
+            name='comment_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='تعداد نظرات تایید شده'),
+        ),
+        migrations.RunPython(
+            populate_comment_count,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-18 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0014_add_comment_count_to_film'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppliedVisitBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64, unique=True)),
+                ('applied_date', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'دسته بازدید اعمال شده',
+                'verbose_name_plural': 'دسته بازدید اعمال شده',
+            },
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2 on 2026-10-18 02:54
+
+import re
+
+from django.db import migrations, models
+
+SEARCH_INDEX_NAME = 'movie_film_search_document_gin'
+
+# A frozen copy of movie.search.normalize_text, so later changes to it do
+# not change what this migration writes.
+CHARACTER_MAP = str.maketrans({
+    '\u064a': '\u06cc',
+    '\u0649': '\u06cc',
+    '\u0643': '\u06a9',
+    '\u0629': '\u0647',
+    '\u06c0': '\u0647',
+    '\u0623': '\u0627',
+    '\u0625': '\u0627',
+    '\u200c': '',
+    '\u200d': '',
+    '\u0640': '',
+    **{chr(0x06f0 + digit): str(digit) for digit in range(10)},
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+})
+DIACRITICS = re.compile('[\u064b-\u065f\u0670]')
+SEPARATORS = re.compile(r'[\W_]+')
+
+
+def normalize_text(text):
+    text = DIACRITICS.sub('', (text or '').translate(CHARACTER_MAP))
+    return SEPARATORS.sub(' ', text.lower()).strip()
+
+
+def populate_search_document(apps, schema_editor):
+    Film = apps.get_model('movie', 'Film')
+
+    films = Film.objects.select_related('director') \
+        .prefetch_related('actors').order_by('pk')
+    batch = []
+    for film in films.iterator(chunk_size=500):
+        parts = [
+            film.title,
+            film.title_en,
+            film.director.full_name,
+            film.director.full_name_en,
+        ]
+        for actor in film.actors.all():
+            parts += [actor.full_name, actor.full_name_en]
+        film.search_document = normalize_text(' '.join(parts))
+        batch.append(film)
+
+        if len(batch) == 500:
+            Film.objects.bulk_update(batch, ['search_document'])
+            batch = []
+    Film.objects.bulk_update(batch, ['search_document'])
+
+
+def create_search_index(apps, schema_editor):
+    # Full-text search is only indexed on PostgreSQL; the expression must
+    # match SearchVector('search_document', config='simple').
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f"CREATE INDEX {SEARCH_INDEX_NAME} ON movie_film USING gin "
+        "(to_tsvector('simple'::regconfig, COALESCE(search_document, '')))"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {SEARCH_INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0015_add_appliedvisitbatch_model'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='film',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='متن جستجو'),
+        ),
+        migrations.RunPython(
+            populate_search_document,
+            migrations.RunPython.noop,
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
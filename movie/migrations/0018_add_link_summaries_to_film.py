@@ -0,0 +1,63 @@
+# Generated by Django 5.2 on 2026-10-18 02:59
+
+from django.db import migrations, models
+from django.db.models import Min
+
+# A frozen copy of movie.availability.link_flag and the choices its bits
+# follow, so later changes to them do not change what this migration
+# writes.
+SUBTITLES = ['NS', 'PHS', 'EHS']
+QUALITIES = ['360P', '480P', '720P', '1080P', '2K', '4K']
+
+
+def link_flag(subtitle, quality):
+    try:
+        index = SUBTITLES.index(subtitle) * len(QUALITIES) \
+            + QUALITIES.index(quality)
+    except ValueError:
+        return 0
+    return 1 << index
+
+
+def populate_link_summaries(apps, schema_editor):
+    Film = apps.get_model('movie', 'Film')
+    Link = apps.get_model('movie', 'Link')
+
+    films = {}
+    rows = Link.objects.values('film_id', 'subtitle', 'quality') \
+        .annotate(min_size=Min('size')).order_by()
+    for row in rows:
+        flags, size = films.get(row['film_id'], (0, row['min_size']))
+        films[row['film_id']] = (
+            flags | link_flag(row['subtitle'], row['quality']),
+            min(size, row['min_size']),
+        )
+    for film_id, (flags, size) in films.items():
+        Film.objects.filter(pk=film_id).update(
+            link_flags=flags,
+            min_link_size=size,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0017_add_search_document_to_film'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='film',
+            name='link_flags',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='زیرنویس و کیفیت های موجود'),
+        ),
+        migrations.AddField(
+            model_name='film',
+            name='min_link_size',
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, editable=False, null=True, verbose_name='اندازه کوچک ترین لینک(مگابایت)'),
+        ),
+        migrations.RunPython(
+            populate_link_summaries,
+            migrations.RunPython.noop,
+        ),
+    ]
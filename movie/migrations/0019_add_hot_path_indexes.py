@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-18 03:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0018_add_link_summaries_to_film'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['film', 'parent', 'status', 'created_date'], name='movie_comment_thread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='film',
+            index=models.Index(fields=['status', 'last_update_date'], name='movie_film_status_update_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='film',
+            index=models.Index(fields=['status', 'imdb_rating'], name='movie_film_status_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='film',
+            index=models.Index(fields=['status', 'visit_count'], name='movie_film_status_visits_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['film', 'season', 'episode'], name='movie_link_episode_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['subtitle', 'film'], name='movie_link_subtitle_film_idx'),
+        ),
+        # Covered by the composite indexes above.
+        migrations.AlterField(
+            model_name='comment',
+            name='film',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='movie.film', verbose_name='فیلم مربوطه'),
+        ),
+        migrations.AlterField(
+            model_name='link',
+            name='film',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='links', to='movie.film', verbose_name='فیلم'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 03:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0019_add_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='film',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False, verbose_name='محبوبیت اخیر'),
+        ),
+        migrations.AddIndex(
+            model_name='film',
+            index=models.Index(fields=['status', 'popularity'], name='movie_film_status_popular_idx'),
+        ),
+    ]
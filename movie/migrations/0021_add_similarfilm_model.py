@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 03:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0020_add_popularity_to_film'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarFilm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='رتبه')),
+                ('score', models.FloatField(verbose_name='میزان شباهت')),
+                ('film', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='movie.film', verbose_name='فیلم')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='movie.film', verbose_name='فیلم مشابه')),
+            ],
+            options={
+                'verbose_name': 'فیلم مشابه',
+                'verbose_name_plural': 'فیلم مشابه',
+                'constraints': [models.UniqueConstraint(fields=('film', 'rank'), name='movie_similarfilm_unique_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2 on 2026-10-18 03:24
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# Conflicting groups listed in the error message.
+MAX_REPORTED_DUPLICATES = 50
+
+
+def check_duplicate_episode_links(apps, schema_editor):
+    # Duplicates are left for an editor to resolve instead of deleting
+    # links here.
+    Link = apps.get_model('movie', 'Link')
+    duplicates = list(
+        Link.objects.filter(season__isnull=False, episode__isnull=False)
+        .values_list('film_id', 'season', 'episode', 'quality', 'subtitle')
+        .annotate(count=Count('pk'))
+        .filter(count__gt=1)
+        .order_by('film_id', 'season', 'episode', 'quality', 'subtitle')
+    )
+    if not duplicates:
+        return
+    groups = '\n'.join(
+        f'  film {film_id}, season {season}, episode {episode}, '
+        f'quality {quality}, subtitle {subtitle}: {count} links'
+        for film_id, season, episode, quality, subtitle, count
+        in duplicates[:MAX_REPORTED_DUPLICATES]
+    )
+    if len(duplicates) > MAX_REPORTED_DUPLICATES:
+        groups += (
+            f'\n  ... and {len(duplicates) - MAX_REPORTED_DUPLICATES} '
+            'more'
+        )
+    raise RuntimeError(
+        'Cannot add movie_link_unique_episode: these links share a film, '
+        'season, episode, quality and subtitle. Delete or change the '
+        f'extra links, then migrate again.\n{groups}'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0021_add_similarfilm_model'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            check_duplicate_episode_links,
+            migrations.RunPython.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='link',
+            constraint=models.UniqueConstraint(fields=('film', 'season', 'episode', 'quality', 'subtitle'), name='movie_link_unique_episode'),
+        ),
+        migrations.RemoveIndex(
+            model_name='link',
+            name='movie_link_episode_idx',
+        ),
+    ]
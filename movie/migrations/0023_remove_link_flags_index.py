@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 03:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0022_add_unique_episode_constraint_to_link'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='film',
+            name='link_flags',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='زیرنویس و کیفیت های موجود'),
+        ),
+    ]
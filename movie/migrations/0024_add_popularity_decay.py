@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0023_remove_link_flags_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularityDecay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('decayed_date', models.DateTimeField(null=True, verbose_name='تاریخ آخرین کاهش')),
+            ],
+            options={
+                'verbose_name': 'کاهش محبوبیت',
+                'verbose_name_plural': 'کاهش محبوبیت',
+            },
+        ),
+    ]
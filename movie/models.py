@@ -2,7 +2,7 @@ from datetime import datetime
 
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
 
 from .validators import film_thumbnail_size_validator
 
@@ -207,12 +207,68 @@ class Film(models.Model):
         verbose_name="تعداد بازدید"
     )
 
+    # Visits decayed over time, used to rank trending films; see
+    # movie.popularity.
+    popularity = models.FloatField(
+        default=0,
+        editable=False,
+        verbose_name="محبوبیت اخیر"
+    )
+
+    # Normalized titles, director and actor names; see movie.search.
+    search_document = models.TextField(
+        blank=True,
+        default="",
+        editable=False,
+        verbose_name="متن جستجو"
+    )
+
+    # Number of approved comments, kept in sync by movie.signals.
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        verbose_name="تعداد نظرات تایید شده"
+    )
+
+    # Summaries of the film's links, kept in sync by movie.signals; see
+    # movie.availability.
+    link_flags = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="زیرنویس و کیفیت های موجود"
+    )
+    min_link_size = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        db_index=True,
+        editable=False,
+        verbose_name="اندازه کوچک ترین لینک(مگابایت)"
+    )
+
     def __str__(self):
         return f"{self.title}({self.year})"
 
     class Meta:
         verbose_name = "فیلم"
         verbose_name_plural = "فیلم"
+        indexes = [
+            models.Index(
+                fields=["status", "last_update_date"],
+                name="movie_film_status_update_idx"
+            ),
+            models.Index(
+                fields=["status", "imdb_rating"],
+                name="movie_film_status_rating_idx"
+            ),
+            models.Index(
+                fields=["status", "visit_count"],
+                name="movie_film_status_visits_idx"
+            ),
+            models.Index(
+                fields=["status", "popularity"],
+                name="movie_film_status_popular_idx"
+            ),
+        ]
 
 
 class Link(models.Model):
@@ -281,19 +337,44 @@ class Link(models.Model):
         auto_now_add=True, verbose_name="تاریخ افزودن"
     )
 
+    # Indexed by movie_link_unique_episode.
     film = models.ForeignKey(
         Film,
         on_delete=models.CASCADE,
         related_name="links",
+        db_index=False,
         verbose_name="فیلم"
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored film so that moving a link can refresh the
+        # summaries of both films.
+        instance._loaded_film_id = dict(zip(field_names, values)) \
+            .get("film_id")
+        return instance
+
     def __str__(self):
         return f"{self.film.title} ({self.quality})"
 
     class Meta:
         verbose_name = "لینک"
         verbose_name_plural = "لینک"
+        indexes = [
+            models.Index(
+                fields=["subtitle", "film"],
+                name="movie_link_subtitle_film_idx"
+            ),
+        ]
+        constraints = [
+            # Also serves the film's links ordered by season and episode.
+            # Links without a season never conflict, as NULLs are distinct.
+            models.UniqueConstraint(
+                fields=["film", "season", "episode", "quality", "subtitle"],
+                name="movie_link_unique_episode"
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -334,10 +415,12 @@ class Comment(models.Model):
         verbose_name="تاریخ"
     )
 
+    # Indexed by movie_comment_thread_idx.
     film = models.ForeignKey(
         Film,
         on_delete=models.CASCADE,
         related_name="comments",
+        db_index=False,
         verbose_name="فیلم مربوطه"
     )
 
@@ -356,6 +439,27 @@ class Comment(models.Model):
         verbose_name="والد"
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so that approving, rejecting or moving
+        # a comment can update the film's counter on save.
+        loaded = dict(zip(field_names, values))
+        instance._loaded_values = {
+            "status": loaded.get("status"),
+            "film_id": loaded.get("film_id"),
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Keep the row and the film's comment counter in one transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_values = {
+            "status": self.status,
+            "film_id": self.film_id,
+        }
+
     def __str__(self):
         max_text_length = 25
         if len(self.text) < max_text_length:
@@ -365,3 +469,79 @@ class Comment(models.Model):
     class Meta:
         verbose_name = "نظر"
         verbose_name_plural = "نظر"
+        indexes = [
+            models.Index(
+                fields=["film", "parent", "status", "created_date"],
+                name="movie_comment_thread_idx"
+            ),
+        ]
+
+
+class AppliedVisitBatch(models.Model):
+    """
+    Marks a buffered visit batch as written to the database, so a flush
+    that is retried after a crash does not count the same visits twice.
+    """
+    token = models.CharField(max_length=64, unique=True)
+    applied_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.token
+
+    class Meta:
+        verbose_name = "دسته بازدید اعمال شده"
+        verbose_name_plural = "دسته بازدید اعمال شده"
+
+
+class PopularityDecay(models.Model):
+    """
+    The single row recording when film popularity was last decayed; see
+    movie.popularity.
+    """
+    decayed_date = models.DateTimeField(
+        null=True,
+        verbose_name="تاریخ آخرین کاهش"
+    )
+
+    def __str__(self):
+        return str(self.decayed_date)
+
+    class Meta:
+        verbose_name = "کاهش محبوبیت"
+        verbose_name_plural = "کاهش محبوبیت"
+
+
+class SimilarFilm(models.Model):
+    """
+    A precomputed recommendation: `similar` is the `rank`-th most similar
+    film to `film`. Rebuilt by movie.similarity.
+    """
+    # Indexed by movie_similarfilm_unique_rank.
+    film = models.ForeignKey(
+        Film,
+        on_delete=models.CASCADE,
+        related_name="similarities",
+        db_index=False,
+        verbose_name="فیلم"
+    )
+    similar = models.ForeignKey(
+        Film,
+        on_delete=models.CASCADE,
+        related_name="similar_to",
+        verbose_name="فیلم مشابه"
+    )
+    rank = models.PositiveSmallIntegerField(verbose_name="رتبه")
+    score = models.FloatField(verbose_name="میزان شباهت")
+
+    def __str__(self):
+        return f"{self.film_id} -> {self.similar_id}"
+
+    class Meta:
+        verbose_name = "فیلم مشابه"
+        verbose_name_plural = "فیلم مشابه"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["film", "rank"],
+                name="movie_similarfilm_unique_rank"
+            ),
+        ]
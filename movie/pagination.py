@@ -0,0 +1,228 @@
+import base64
+import binascii
+import datetime
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import (
+    BasePagination,
+    LimitOffsetPagination,
+    _positive_int,
+)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder trims datetimes to milliseconds, which would make
+    # the seek condition skip or repeat rows.
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on every ordering field plus a unique
+    tie-breaker column, so fetching a page never scans the rows before it.
+
+    Unlike DRF's ``CursorPagination`` it does not fall back to an offset
+    when many rows share the same ordering value.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    ordering = ("-created_date",)
+    tie_breaker = "id"
+    invalid_cursor_message = "نشانگر صفحه نامعتبر است."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        position, self.is_reverse = self.decode_cursor(request)
+        ordering = self.ordering
+        if self.is_reverse:
+            ordering = [self._flip(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+
+        if position is not None:
+            position = self._to_python(queryset.model, position)
+            queryset = queryset.filter(self._seek_filter(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if self.is_reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, "filter_backends", []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+
+        ordering = list(ordering or self.ordering)
+        field_names = [field.lstrip("-") for field in ordering]
+        if self.tie_breaker not in field_names:
+            prefix = "-" if ordering[0].startswith("-") else ""
+            ordering.append(prefix + self.tie_breaker)
+        return ordering
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            ordering, position = cursor["o"], cursor["p"]
+            is_reverse = bool(cursor["r"])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if ordering != self.ordering or len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, is_reverse
+
+    def encode_cursor(self, instance, is_reverse):
+        position = [
+            getattr(instance, field.lstrip("-")) for field in self.ordering
+        ]
+        cursor = {"o": self.ordering, "p": position, "r": int(is_reverse)}
+        encoded = json.dumps(cursor, cls=CursorEncoder).encode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            base64.urlsafe_b64encode(encoded).decode()
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], is_reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], is_reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {
+                    "type": "string",
+                    "nullable": True,
+                    "format": "uri"
+                },
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "مقدار نشانگر صفحه",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "تعداد نتایج در هر صفحه",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def _to_python(self, model, position):
+        values = []
+        for field, value in zip(self.ordering, position):
+            try:
+                model_field = model._meta.get_field(field.lstrip("-"))
+            except FieldDoesNotExist:
+                values.append(value)
+            else:
+                values.append(model_field.to_python(value))
+        return values
+
+    def _seek_filter(self, ordering, position):
+        seek = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition = Q(**{f"{name}__{lookup}": position[index]})
+            for prev_field, prev_value in zip(ordering, position[:index]):
+                condition &= Q(**{prev_field.lstrip("-"): prev_value})
+            seek |= condition
+        return seek
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith("-") else "-" + field
+
+
+class FilmCursorPagination(KeysetPagination):
+    ordering = ("-last_update_date",)
+    mode_query_param = "pagination"
+    mode = "cursor"
+
+    @classmethod
+    def is_requested(cls, request):
+        params = request.query_params
+        return (params.get(cls.mode_query_param) == cls.mode
+                or cls.cursor_query_param in params)
+
+
+class CommentReplyPagination(KeysetPagination):
+    ordering = ("created_date",)
+
+
+class EpisodePagination(LimitOffsetPagination):
+    """Pages of a serial's episodes, each with all of its links."""
+    max_limit = 100
@@ -0,0 +1,49 @@
+"""
+Time-decayed film popularity for the trending rail.
+
+Flushed visits are added to ``Film.popularity`` (see movie.visits) and the
+``decay_film_popularity`` task periodically multiplies every score by
+``0.5 ** (elapsed / FILM_POPULARITY_HALF_LIFE)``, so a visit counts half
+as much after every half-life. The time of the last decay is stored in
+the database, in the same transaction as the scores it decayed.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.generations import bump_generations
+
+from .models import Film, PopularityDecay
+from .visits import VISITS_GENERATION
+
+# Scores below this are rounded down to zero, so films nobody visits
+# stop being rewritten by every decay.
+MIN_POPULARITY = 0.01
+
+
+def decay_popularity():
+    """Decay all popularity scores by the time since the last decay."""
+    with transaction.atomic():
+        # Locking the row makes concurrent decays run one after the other,
+        # each measuring the time since the previous one.
+        state, _ = PopularityDecay.objects.select_for_update() \
+            .get_or_create(pk=1)
+        now = timezone.now()
+        elapsed = (now - state.decayed_date).total_seconds() \
+            if state.decayed_date is not None \
+            else settings.FILM_POPULARITY_DECAY_INTERVAL
+        factor = 0.5 ** (max(elapsed, 0) / settings.FILM_POPULARITY_HALF_LIFE)
+
+        decayed = Film.objects \
+            .filter(popularity__gte=MIN_POPULARITY / factor) \
+            .update(popularity=F("popularity") * factor)
+        decayed += Film.objects.filter(
+            popularity__gt=0,
+            popularity__lt=MIN_POPULARITY / factor
+        ).update(popularity=0)
+
+        state.decayed_date = now
+        state.save(update_fields=["decayed_date"])
+        bump_generations(VISITS_GENERATION)
+    return decayed
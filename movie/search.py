@@ -0,0 +1,133 @@
+"""
+Film search over a normalized search document.
+
+Each film stores ``search_document``: its titles, director and actor names
+normalized so that Arabic and Persian letter variants, diacritics and
+ZWNJ spellings compare equal. PostgreSQL searches it through a GIN
+full-text index; other databases (SQLite in development) fall back to
+substring matching with a simple relevance score.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Film
+
+CHARACTER_MAP = str.maketrans({
+    "\u064a": "\u06cc",  # Arabic yeh -> Persian yeh
+    "\u0649": "\u06cc",  # Alef maksura -> Persian yeh
+    "\u0643": "\u06a9",  # Arabic kaf -> keheh
+    "\u0629": "\u0647",  # Teh marbuta -> heh
+    "\u06c0": "\u0647",  # Heh with yeh above -> heh
+    "\u0623": "\u0627",  # Alef with hamza above -> alef
+    "\u0625": "\u0627",  # Alef with hamza below -> alef
+    "\u200c": "",  # ZWNJ
+    "\u200d": "",  # ZWJ
+    "\u0640": "",  # Tatweel
+    **{chr(0x06f0 + digit): str(digit) for digit in range(10)},
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+})
+
+# Harakat, tanwin, shadda, sukun and superscript alef.
+DIACRITICS = re.compile("[\u064b-\u065f\u0670]")
+SEPARATORS = re.compile(r"[\W_]+")
+
+DOCUMENT_BATCH_SIZE = 500
+
+
+def normalize_text(text):
+    text = DIACRITICS.sub("", (text or "").translate(CHARACTER_MAP))
+    return SEPARATORS.sub(" ", text.lower()).strip()
+
+
+def build_search_document(film):
+    """Search document of a film with its director and actors loaded."""
+    parts = [film.title, film.title_en]
+    if film.director_id:
+        parts += [film.director.full_name, film.director.full_name_en]
+    for actor in film.actors.all():
+        parts += [actor.full_name, actor.full_name_en]
+    return normalize_text(" ".join(parts))
+
+
+def refresh_search_documents(film_ids):
+    film_ids = sorted(set(film_ids))
+    for start in range(0, len(film_ids), DOCUMENT_BATCH_SIZE):
+        films = list(
+            Film.objects.filter(
+                pk__in=film_ids[start:start + DOCUMENT_BATCH_SIZE]
+            ).select_related("director").prefetch_related("actors")
+        )
+        for film in films:
+            film.search_document = build_search_document(film)
+        Film.objects.bulk_update(films, ["search_document"])
+
+
+class FilmSearchFilter(BaseFilterBackend):
+    """
+    Filters films by the `search` query parameter and, unless an explicit
+    `ordering` is requested, orders them by relevance.
+    """
+    search_param = "search"
+    ordering_param = "ordering"
+
+    def filter_queryset(self, request, queryset, view):
+        terms = normalize_text(
+            request.query_params.get(self.search_param, "")
+        ).split()
+        if not terms:
+            return queryset
+
+        if connection.vendor == "postgresql":
+            queryset = self.filter_postgresql(queryset, terms)
+        else:
+            queryset = self.filter_fallback(queryset, terms)
+
+        if self.ordering_param not in request.query_params:
+            ordering = queryset.query.order_by or Film._meta.ordering
+            queryset = queryset.order_by("-search_rank", *ordering)
+        return queryset
+
+    def filter_postgresql(self, queryset, terms):
+        from django.contrib.postgres.search import (
+            SearchQuery,
+            SearchRank,
+            SearchVector,
+        )
+
+        # Must match the expression of the GIN index on search_document.
+        vector = SearchVector("search_document", config="simple")
+        query = SearchQuery(
+            " & ".join(f"{term}:*" for term in terms),
+            config="simple",
+            search_type="raw"
+        )
+        return queryset.annotate(
+            search_vector=vector,
+            search_rank=SearchRank(vector, query),
+        ).filter(search_vector=query)
+
+    def filter_fallback(self, queryset, terms):
+        rank = Value(0)
+        for term in terms:
+            queryset = queryset.filter(search_document__contains=term)
+            rank += Case(
+                When(search_document__startswith=term, then=Value(3)),
+                When(search_document__contains=f" {term}", then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        return queryset.annotate(search_rank=rank)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.search_param,
+                "required": False,
+                "in": "query",
+                "description": "عبارت جستجو",
+                "schema": {"type": "string"},
+            },
+        ]
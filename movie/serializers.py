@@ -1,8 +1,49 @@
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import FileField, Manager
+from django.utils import timezone
 from django.utils.module_loading import import_string
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
 from . import models
+from .availability import refresh_link_summaries, season_summaries
+from .bulk import films_changed, sync_film_relations
+from .caching import invalidate_films
+from .fields import BulkPrimaryKeyRelatedField
+from .search import refresh_search_documents
+
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    A ModelSerializer that takes an additional `fields` argument that
+    controls which fields should be displayed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+class PreloadingListSerializer(serializers.ListSerializer):
+    """
+    A list serializer looking up the related ids of all of its items
+    together before validating the items one by one.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.preload([item for item in data if isinstance(item, dict)])
+        return super().to_internal_value(data)
+
+    def preload(self, items):
+        for name, field in self.child.fields.items():
+            if not field.read_only and hasattr(field, "preload"):
+                field.preload([item[name] for item in items if name in item])
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -67,9 +108,22 @@ class CommentNestedSerializer(serializers.ModelSerializer):
         method_name="get_replies",
         read_only=True
     )
+    reply_count = serializers.SerializerMethodField(read_only=True)
+
+    def get_reply_count(self, comment):
+        reply_counts = self.context.get("reply_counts")
+        if reply_counts is not None:
+            return reply_counts.get(comment.id, 0)
+        return models.Comment.objects.filter(parent_id=comment.id).count()
 
     def get_replies(self, comment):
-        queryset = models.Comment.objects.filter(parent_id=comment.id)
+        # Views pass the thread's replies grouped by parent, so nesting is
+        # built in memory instead of querying once per comment.
+        replies_by_parent = self.context.get("replies")
+        if replies_by_parent is not None:
+            queryset = replies_by_parent.get(comment.id, [])
+        else:
+            queryset = models.Comment.objects.filter(parent_id=comment.id)
         return CommentNestedSerializer(
             queryset,
             many=True,
@@ -82,6 +136,7 @@ class CommentNestedSerializer(serializers.ModelSerializer):
             "id",
             "parent",
             "replies",
+            "reply_count",
             "user",
             "text",
             "rating",
@@ -117,7 +172,7 @@ class CommentNestedSerializer(serializers.ModelSerializer):
 
 
 class LinkSerializer(serializers.ModelSerializer):
-    languages = serializers.PrimaryKeyRelatedField(
+    languages = BulkPrimaryKeyRelatedField(
         queryset=models.Language.objects.all(),
         many=True,
         label="زبان ها"
@@ -146,7 +201,137 @@ class LinkNestedSerializer(serializers.ModelSerializer):
         ]
 
 
-class FilmSerializer(serializers.ModelSerializer):
+class FilmLinkListSerializer(serializers.ListSerializer):
+    """
+    The links of a film that are not part of a season; the episodes of
+    serials are listed by `films/{id}/links/`.
+    """
+
+    def to_representation(self, data):
+        links = data.all() if isinstance(data, Manager) else data
+        return super().to_representation(
+            [link for link in links if link.season is None]
+        )
+
+
+class EpisodeLinksSerializer(serializers.Serializer):
+    season = serializers.IntegerField(allow_null=True, label="فصل")
+    episode = serializers.IntegerField(allow_null=True, label="قسمت")
+    links = LinkNestedSerializer(many=True)
+
+
+class SeasonSummarySerializer(serializers.Serializer):
+    season = serializers.IntegerField(label="فصل")
+    episode_count = serializers.IntegerField(label="تعداد قسمت ها")
+    qualities = serializers.ListField(
+        child=serializers.ChoiceField(choices=models.Link.QUALITY_CHOICES),
+        label="کیفیت ها"
+    )
+
+
+class SeasonLinkSerializer(serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
+
+    class Meta:
+        model = models.Link
+        fields = ["episode", "url", "size", "quality", "subtitle",
+                  "languages"]
+        extra_kwargs = {
+            "episode": {"required": True, "allow_null": False},
+            "languages": {"required": False, "allow_empty": False},
+        }
+        list_serializer_class = PreloadingListSerializer
+
+
+class SeasonLinksSerializer(serializers.Serializer):
+    """
+    The links of a serial's season, created at once. `subtitle` and
+    `languages` apply to the links that do not set their own.
+    """
+
+    season = serializers.IntegerField(
+        min_value=1,
+        max_value=32767,
+        label="فصل"
+    )
+    subtitle = serializers.ChoiceField(
+        choices=models.Link.SUBTITLE_CHOICES,
+        default=models.Link.SUBTITLE_NO_SUB,
+        label="زیرنویس"
+    )
+    languages = BulkPrimaryKeyRelatedField(
+        queryset=models.Language.objects.all(),
+        many=True,
+        allow_empty=False,
+        label="زبان ها"
+    )
+    links = SeasonLinkSerializer(many=True, allow_empty=False)
+
+    duplicate_error = "این قسمت با همین کیفیت و زیرنویس تکراری است."
+
+    def validate(self, attrs):
+        film = self.context["film"]
+        if not film.is_serial:
+            raise serializers.ValidationError(
+                {"season": ["فصل و قسمت فقط برای سریال ها ثبت می شود."]}
+            )
+
+        for link in attrs["links"]:
+            link.setdefault("subtitle", attrs["subtitle"])
+            link.setdefault("languages", attrs["languages"])
+
+        seen = set(models.Link.objects.filter(
+            film=film,
+            season=attrs["season"]
+        ).values_list("episode", "quality", "subtitle"))
+        errors = []
+        for link in attrs["links"]:
+            key = (link["episode"], link["quality"], link["subtitle"])
+            errors.append(
+                {"episode": [self.duplicate_error]} if key in seen else {}
+            )
+            seen.add(key)
+        if any(errors):
+            raise serializers.ValidationError({"links": errors})
+        return attrs
+
+    def create(self, validated_data):
+        film = self.context["film"]
+        links = [
+            models.Link(
+                film=film,
+                season=validated_data["season"],
+                episode=data["episode"],
+                url=data["url"],
+                size=data["size"],
+                quality=data["quality"],
+                subtitle=data["subtitle"],
+            )
+            for data in validated_data["links"]
+        ]
+        through = models.Link.languages.through
+        with transaction.atomic():
+            try:
+                # The unique constraint catches links added concurrently.
+                with transaction.atomic():
+                    models.Link.objects.bulk_create(links)
+            except IntegrityError:
+                raise serializers.ValidationError(
+                    {"links": [self.duplicate_error]}
+                )
+            through.objects.bulk_create([
+                through(link_id=link.pk, language_id=language_id)
+                for link, data in zip(links, validated_data["links"])
+                for language_id in dict.fromkeys(
+                    language.pk for language in data["languages"]
+                )
+            ])
+            refresh_link_summaries([film.pk])
+            invalidate_films([film.pk])
+        return links
+
+
+class FilmSerializer(DynamicFieldsModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
     director = DirectorSerializer()
     genres = CollectionSerializer(many=True)
@@ -154,9 +339,21 @@ class FilmSerializer(serializers.ModelSerializer):
     actors = ActorSerializer(many=True)
     countries = CountrySerializer(many=True)
     original_languages = LanguageSerializer(many=True)
-    links = LinkNestedSerializer(many=True)
+    links = FilmLinkListSerializer(child=LinkNestedSerializer())
+    seasons = serializers.SerializerMethodField()
     comment_count = serializers.IntegerField(read_only=True)
 
+    @extend_schema_field(SeasonSummarySerializer(many=True))
+    def get_seasons(self, film):
+        # Views pass the summaries of all the serialized films, so a page
+        # of serials costs two queries.
+        if not film.is_serial:
+            return []
+        summaries = self.context.get("season_summaries")
+        if summaries is None:
+            summaries = season_summaries([film.pk])
+        return summaries.get(film.pk, [])
+
     class Meta:
         model = models.Film
         fields = [
@@ -183,34 +380,136 @@ class FilmSerializer(serializers.ModelSerializer):
             "countries",
             "original_languages",
             "links",
+            "seasons",
         ]
 
 
+class FilmCardSerializer(serializers.ModelSerializer):
+    genres = GenreSerializer(many=True)
+    comment_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = models.Film
+        fields = [
+            "id",
+            "title",
+            "year",
+            "thumbnail",
+            "imdb_rating",
+            "genres",
+            "comment_count",
+        ]
+
+
+class FilmBulkSerializer(PreloadingListSerializer):
+    """
+    Create or update many films at once. The related ids of all the items
+    are looked up together, and the films, their changed columns and
+    their through-table rows are written with bulk queries in a single
+    transaction. Updates take the films to update as `instance` and
+    match the items to them by `id`.
+    """
+
+    def to_internal_value(self, data):
+        self.films = {}
+        self.matched = {}
+        return super().to_internal_value(data)
+
+    def preload(self, items):
+        super().preload(items)
+        if self.instance is not None:
+            self.films = self.instance.in_bulk([
+                item["id"] for item in items
+                if isinstance(item.get("id"), int)
+            ])
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            film = self.films.get(data.get("id")) \
+                if isinstance(data, dict) else None
+            if film is None:
+                raise serializers.ValidationError(
+                    {"id": ["فیلمی با این شناسه یافت نشد"]}
+                )
+            if film.pk in self.matched:
+                raise serializers.ValidationError(
+                    {"id": ["این فیلم بیش از یک بار فرستاده شده است."]}
+                )
+            self.matched[film.pk] = film
+            self.child.instance = film
+        return super().run_child_validation(data)
+
+    def create(self, validated_data):
+        relations = [
+            self.child.pop_relations(data) for data in validated_data
+        ]
+        films = [
+            models.Film(**data, user=self.context["user"])
+            for data in validated_data
+        ]
+        with transaction.atomic():
+            models.Film.objects.bulk_create(films)
+            sync_film_relations({
+                film.pk: film_relations
+                for film, film_relations in zip(films, relations)
+            })
+            films_changed([film.pk for film in films])
+        return films
+
+    def update(self, instance, validated_data):
+        now = timezone.now()
+        fields = set()
+        changed = set()
+        relations = {}
+        films = list(self.matched.values())
+        for film, data in zip(films, validated_data):
+            relations[film.pk] = self.child.pop_relations(data)
+            for name, value in data.items():
+                if self.child.has_changed(film, name, value):
+                    fields.add(name)
+                    changed.add(film.pk)
+                setattr(film, name, value)
+
+        with transaction.atomic():
+            changed |= sync_film_relations(relations)
+            updated = [film for film in films if film.pk in changed]
+            for film in updated:
+                film.last_update_date = now
+            models.Film.objects.bulk_update(
+                updated,
+                [*fields, "last_update_date"]
+            )
+            films_changed(changed)
+        return films
+
+
 class FilmSavingSerializer(serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
+
     user = serializers.PrimaryKeyRelatedField(read_only=True)
 
-    genres = serializers.PrimaryKeyRelatedField(
+    genres = BulkPrimaryKeyRelatedField(
         queryset=models.Genre.objects.all(), many=True, label="ژانر ها")
 
-    collections = serializers.PrimaryKeyRelatedField(
+    collections = BulkPrimaryKeyRelatedField(
         queryset=models.Collection.objects.all(),
         many=True,
         required=False,
         label="دسته بندی ها"
     )
 
-    actors = serializers.PrimaryKeyRelatedField(
+    actors = BulkPrimaryKeyRelatedField(
         queryset=models.Actor.objects.all(),
         many=True,
         required=False,
         label="بازیگران"
     )
 
-    countries = serializers.PrimaryKeyRelatedField(
+    countries = BulkPrimaryKeyRelatedField(
         queryset=models.Country.objects.all(), many=True, label="کشور ها"
     )
 
-    original_languages = serializers.PrimaryKeyRelatedField(
+    original_languages = BulkPrimaryKeyRelatedField(
         queryset=models.Language.objects.all(), many=True, label="زبان ها"
     )
 
@@ -238,6 +537,7 @@ class FilmSavingSerializer(serializers.ModelSerializer):
             "countries",
             "original_languages",
         ]
+        list_serializer_class = FilmBulkSerializer
 
     def validate_countries(self, countries):
         if not countries:
@@ -258,3 +558,48 @@ class FilmSavingSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data["user"] = self.context["user"]
         return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        """
+        Write only what changed: the film row is saved, and its signals
+        refresh the caches, only when a column or a relation differs from
+        the stored data, and the UPDATE names only the changed columns.
+        """
+        relations = self.pop_relations(validated_data)
+        changed_fields = []
+        for name, value in validated_data.items():
+            if self.has_changed(instance, name, value):
+                changed_fields.append(name)
+            setattr(instance, name, value)
+
+        with transaction.atomic():
+            relations_changed = sync_film_relations({instance.pk: relations})
+            if changed_fields or relations_changed:
+                instance.save(
+                    update_fields=[*changed_fields, "last_update_date"]
+                )
+            if relations_changed:
+                # Saving only the changed columns skips the search
+                # document refresh when just the cast changed.
+                refresh_search_documents([instance.pk])
+        return instance
+
+    @staticmethod
+    def pop_relations(validated_data):
+        """Remove the M2M lists from `validated_data` and return their ids."""
+        return {
+            field.name: {value.pk for value in validated_data.pop(field.name)}
+            for field in models.Film._meta.many_to_many
+            if field.name in validated_data
+        }
+
+    @staticmethod
+    def has_changed(instance, name, value):
+        field = instance._meta.get_field(name)
+        if isinstance(field, FileField):
+            return True
+        if field.is_relation:
+            return getattr(instance, field.attname) != getattr(
+                value, "pk", value
+            )
+        return getattr(instance, name) != value
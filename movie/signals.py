@@ -0,0 +1,223 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core.generations import bump_generations
+
+from .availability import refresh_link_summaries
+from .caching import invalidate_films
+from .counters import adjust_comment_count, refresh_comment_counts
+from .film_index import refresh_film_index
+from .models import (
+    Actor,
+    Collection,
+    Comment,
+    Country,
+    Director,
+    Film,
+    Genre,
+    Language,
+    Link,
+)
+from .search import refresh_search_documents
+
+SEARCH_DOCUMENT_FIELDS = {"title", "title_en", "director", "director_id"}
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_count_on_save(sender, instance, created, raw=False,
+                                 **kwargs):
+    if raw:
+        return
+
+    is_approved = instance.status == Comment.STATUS_APPROVED
+    if created:
+        adjust_comment_count(instance.film_id, int(is_approved))
+        return
+
+    loaded = getattr(instance, "_loaded_values", None)
+    if loaded is None or loaded["film_id"] is None \
+            or loaded["status"] is None:
+        # The previous state is unknown; recount instead of guessing.
+        refresh_comment_counts([instance.film_id])
+        return
+
+    was_approved = loaded["status"] == Comment.STATUS_APPROVED
+    if loaded["film_id"] != instance.film_id:
+        refresh_comment_counts([loaded["film_id"], instance.film_id])
+    elif was_approved != is_approved:
+        adjust_comment_count(instance.film_id, 1 if is_approved else -1)
+
+
+@receiver(post_delete, sender=Comment)
+def update_comment_count_on_delete(sender, instance, **kwargs):
+    if instance.status == Comment.STATUS_APPROVED:
+        adjust_comment_count(instance.film_id, -1)
+
+
+@receiver(post_save, sender=Film)
+def update_search_document_on_film_save(sender, instance, raw=False,
+                                        update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None \
+            and not SEARCH_DOCUMENT_FIELDS & set(update_fields):
+        return
+    refresh_search_documents([instance.pk])
+
+
+@receiver(post_save, sender=Director)
+@receiver(post_save, sender=Actor)
+def update_search_document_on_name_change(sender, instance, created,
+                                          raw=False, **kwargs):
+    if raw or created:
+        return
+    refresh_search_documents(
+        instance.films.values_list("pk", flat=True)
+    )
+
+
+@receiver(pre_delete, sender=Actor)
+def remember_films_of_deleted_actor(sender, instance, **kwargs):
+    # Deleting an actor removes its cast rows without sending m2m_changed.
+    instance._deleted_film_ids = list(
+        instance.films.values_list("pk", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Actor)
+def update_search_document_on_actor_delete(sender, instance, **kwargs):
+    refresh_search_documents(getattr(instance, "_deleted_film_ids", []))
+
+
+@receiver(m2m_changed, sender=Film.actors.through)
+def update_search_document_on_cast_change(sender, instance, action,
+                                          reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            refresh_search_documents([instance.pk])
+    elif action == "pre_clear":
+        instance._cleared_film_ids = list(
+            instance.films.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        refresh_search_documents(getattr(instance, "_cleared_film_ids", []))
+    elif action in ("post_add", "post_remove"):
+        refresh_search_documents(pk_set)
+
+
+@receiver(post_save, sender=Film)
+@receiver(post_delete, sender=Film)
+def invalidate_film_on_change(sender, instance, **kwargs):
+    invalidate_films([instance.pk])
+    refresh_film_index([instance.pk])
+
+
+@receiver(m2m_changed, sender=Film.genres.through)
+@receiver(m2m_changed, sender=Film.collections.through)
+@receiver(m2m_changed, sender=Film.actors.through)
+@receiver(m2m_changed, sender=Film.countries.through)
+@receiver(m2m_changed, sender=Film.original_languages.through)
+def update_films_on_relation_change(sender, instance, action, reverse,
+                                    pk_set, **kwargs):
+    if not reverse:
+        if action not in ("post_add", "post_remove", "post_clear"):
+            return
+        film_ids = [instance.pk]
+    elif action == "pre_clear":
+        film_ids = list(sender.objects.filter(
+            **{instance._meta.model_name: instance.pk}
+        ).values_list("film_id", flat=True))
+    elif action in ("post_add", "post_remove"):
+        film_ids = pk_set
+    else:
+        return
+    invalidate_films(film_ids)
+    refresh_film_index(film_ids)
+
+
+@receiver(post_save, sender=Link)
+@receiver(post_delete, sender=Link)
+def invalidate_film_on_link_change(sender, instance, **kwargs):
+    invalidate_films([instance.film_id])
+
+
+@receiver(post_save, sender=Link)
+@receiver(post_delete, sender=Link)
+def update_link_summaries(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    film_ids = [instance.film_id]
+    loaded_film_id = getattr(instance, "_loaded_film_id", None)
+    if loaded_film_id != instance.film_id:
+        film_ids.append(loaded_film_id)
+    refresh_link_summaries(film_ids)
+    instance._loaded_film_id = instance.film_id
+
+
+@receiver(m2m_changed, sender=Link.languages.through)
+def invalidate_film_on_link_languages_change(sender, instance, action,
+                                             reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_films([instance.film_id])
+    elif action == "pre_clear":
+        invalidate_films(
+            instance.links.values_list("film_id", flat=True)
+        )
+    elif action in ("post_add", "post_remove"):
+        invalidate_films(Link.objects.filter(pk__in=pk_set)
+                         .values_list("film_id", flat=True))
+
+
+@receiver(post_save, sender=Director)
+@receiver(post_save, sender=Actor)
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Collection)
+@receiver(post_save, sender=Country)
+@receiver(post_save, sender=Language)
+@receiver(pre_delete, sender=Actor)
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Collection)
+@receiver(pre_delete, sender=Country)
+@receiver(pre_delete, sender=Language)
+def invalidate_films_on_attr_change(sender, instance, created=False,
+                                    raw=False, **kwargs):
+    # Film pages embed these objects; deleting one also removes its
+    # through-table rows without sending m2m_changed.
+    if raw or created:
+        return
+    invalidate_films(instance.films.values_list("pk", flat=True))
+    if sender is Language:
+        invalidate_films(
+            instance.links.values_list("film_id", flat=True)
+        )
+
+
+@receiver(pre_delete, sender=Actor)
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Collection)
+@receiver(pre_delete, sender=Country)
+@receiver(pre_delete, sender=Language)
+def refresh_film_index_on_attr_delete(sender, instance, **kwargs):
+    refresh_film_index(instance.films.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Director)
+@receiver(post_save, sender=Actor)
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Collection)
+@receiver(post_save, sender=Country)
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Director)
+@receiver(post_delete, sender=Actor)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Collection)
+@receiver(post_delete, sender=Country)
+@receiver(post_delete, sender=Language)
+def bump_attr_generation(sender, **kwargs):
+    bump_generations(sender._meta.label_lower)
@@ -0,0 +1,157 @@
+"""
+Offline "similar films" recommendations.
+
+Every published film is described by a sparse vector of its genres,
+actors, director, countries and collections, weighted by how rare each
+feature is (IDF) and by the importance of its kind. The nearest films by
+cosine similarity are computed chunk by chunk, so memory stays bounded by
+``FILM_SIMILARITY["CHUNK_SIZE"]`` rows of scores, and stored in
+``SimilarFilm`` for the detail page to read.
+"""
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from .models import Film, SimilarFilm
+
+FEATURE_WEIGHTS = {
+    "genres": 1.0,
+    "actors": 1.0,
+    "director": 1.5,
+    "countries": 0.5,
+    "collections": 1.5,
+}
+RELATION_COLUMNS = {
+    "genres": "genre_id",
+    "actors": "actor_id",
+    "countries": "country_id",
+    "collections": "collection_id",
+}
+
+
+def _feature_pairs(published):
+    """Yield `(kind, film_ids, value_ids)` arrays for every feature kind."""
+    director = published.values_list("pk", "director_id")
+    pairs = np.array(list(director), dtype=np.int64).reshape(-1, 2)
+    yield "director", pairs[:, 0], pairs[:, 1]
+
+    for kind, column in RELATION_COLUMNS.items():
+        rows = getattr(Film, kind).through.objects \
+            .filter(film__in=published) \
+            .values_list("film_id", column)
+        pairs = np.fromiter(
+            (value for row in rows.iterator(chunk_size=10000)
+             for value in row),
+            dtype=np.int64
+        ).reshape(-1, 2)
+        yield kind, pairs[:, 0], pairs[:, 1]
+
+
+def build_feature_matrix():
+    """
+    Return the ids of published films and their L2-normalized feature
+    vectors as a CSR matrix with one row per film.
+    """
+    published = Film.objects.filter(status=Film.STATUS_PUBLISHED)
+    film_ids = np.array(
+        sorted(published.values_list("pk", flat=True)),
+        dtype=np.int64
+    )
+
+    rows, columns, weights = [], [], []
+    offset = 0
+    for kind, pair_films, pair_values in _feature_pairs(published):
+        values, value_columns = np.unique(pair_values, return_inverse=True)
+        rows.append(np.searchsorted(film_ids, pair_films))
+        columns.append(value_columns + offset)
+        weights.append(np.full(len(pair_films), FEATURE_WEIGHTS[kind]))
+        offset += len(values)
+
+    matrix = sparse.csr_matrix(
+        (
+            np.concatenate(weights),
+            (np.concatenate(rows), np.concatenate(columns)),
+        ),
+        shape=(len(film_ids), offset),
+        dtype=np.float32,
+    )
+
+    document_frequency = np.bincount(matrix.indices, minlength=offset)
+    idf = np.log((1 + len(film_ids)) / (1 + document_frequency)) + 1
+    matrix = matrix.multiply(idf.astype(np.float32)).tocsr()
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)))
+    norms[norms == 0] = 1
+    matrix = sparse.diags(1 / norms.ravel()).dot(matrix).tocsr()
+    return film_ids, matrix.astype(np.float32)
+
+
+def top_neighbors(matrix, k, chunk_size, min_score=0):
+    """
+    Yield `(row, neighbor_rows, scores)` with the `k` rows most similar to
+    every row of `matrix`, best first.
+    """
+    transposed = matrix.T.tocsr()
+    for start in range(0, matrix.shape[0], chunk_size):
+        scores = (matrix[start:start + chunk_size] @ transposed).tocsr()
+        for offset in range(scores.shape[0]):
+            row = start + offset
+            begin, end = scores.indptr[offset], scores.indptr[offset + 1]
+            columns = scores.indices[begin:end]
+            values = scores.data[begin:end]
+
+            keep = (columns != row) & (values > min_score)
+            columns, values = columns[keep], values[keep]
+            if len(values) > k:
+                best = np.argpartition(-values, k)[:k]
+                columns, values = columns[best], values[best]
+            order = np.lexsort((columns, -values))
+            yield row, columns[order], values[order]
+
+
+def compute_similar_films():
+    """Rebuild the SimilarFilm table and return the number of rows."""
+    config = settings.FILM_SIMILARITY
+    film_ids, matrix = build_feature_matrix()
+    if not len(film_ids):
+        SimilarFilm.objects.all().delete()
+        return 0
+
+    created = 0
+    batch, batch_films = [], []
+    neighbors = top_neighbors(
+        matrix,
+        k=config["TOP_K"],
+        chunk_size=config["CHUNK_SIZE"],
+        min_score=config.get("MIN_SCORE", 0),
+    )
+    for row, neighbor_rows, scores in neighbors:
+        film_id = int(film_ids[row])
+        batch_films.append(film_id)
+        batch += [
+            SimilarFilm(
+                film_id=film_id,
+                similar_id=int(film_ids[neighbor]),
+                rank=rank,
+                score=float(score),
+            )
+            for rank, (neighbor, score) in enumerate(
+                zip(neighbor_rows, scores),
+                start=1
+            )
+        ]
+        if len(batch_films) >= config["CHUNK_SIZE"]:
+            created += _replace_similar_films(batch_films, batch)
+            batch, batch_films = [], []
+    created += _replace_similar_films(batch_films, batch)
+
+    SimilarFilm.objects.exclude(film__status=Film.STATUS_PUBLISHED).delete()
+    return created
+
+
+def _replace_similar_films(film_ids, rows):
+    with transaction.atomic():
+        SimilarFilm.objects.filter(film_id__in=film_ids).delete()
+        SimilarFilm.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
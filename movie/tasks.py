@@ -1,8 +1,30 @@
 from celery import shared_task
+from django.db import transaction
 
+from . import similarity
 from .models import Comment
+from .popularity import decay_popularity
+from .visits import get_visit_buffer
 
 
 @shared_task
 def delete_rejected_comments():
-    Comment.objects.filter(status=Comment.STATUS_REJECTED).delete()
+    # Approved replies of rejected comments are deleted by the cascade;
+    # the post_delete signal keeps the films' comment counters in sync.
+    with transaction.atomic():
+        Comment.objects.filter(status=Comment.STATUS_REJECTED).delete()
+
+
+@shared_task
+def flush_visit_counts():
+    return get_visit_buffer().flush()
+
+
+@shared_task
+def decay_film_popularity():
+    return decay_popularity()
+
+
+@shared_task
+def compute_similar_films():
+    return similarity.compute_similar_films()
@@ -1,7 +1,22 @@
 import pytest
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from rest_framework.test import APIClient
 
+from movie.film_index import get_film_index
+from movie.visits import get_visit_buffer
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Visits, cached responses, counters and the film index outlive a
+    # test; keep every test independent of the ones that ran before it.
+    cache.clear()
+    get_visit_buffer.cache_clear()
+    get_film_index.cache_clear()
+    yield
+    cache.clear()
+
 
 @pytest.fixture
 def api_client():
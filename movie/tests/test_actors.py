@@ -3,7 +3,7 @@ from django.urls import reverse
 from model_bakery import baker
 from rest_framework import status
 
-from movie.models import Actor
+from movie.models import Actor, Film
 
 ACTOR_LIST_URL = reverse("movie:actor-list")
 
@@ -108,6 +108,23 @@ class TestDeleteActor:
         response = api_client.get(actor_detail_url(actor.id))
         assert response.status_code == status.HTTP_404_NOT_FOUND
 
+    def test_delete_actor_updates_film_search_document(
+            self,
+            authenticate,
+            delete_actor
+    ):
+        authenticate(is_staff=True)
+        actor = baker.make(Actor, full_name="reza", full_name_en="rezayi")
+        film = baker.make(Film, title="film", title_en="film")
+        film.actors.add(actor)
+        film.refresh_from_db()
+        assert "rezayi" in film.search_document
+
+        delete_actor(actor.id)
+
+        film.refresh_from_db()
+        assert "rezayi" not in film.search_document
+
 
 @pytest.mark.django_db
 class TestUpdateActor:
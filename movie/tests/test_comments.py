@@ -1,9 +1,22 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
 import pytest
+from django.contrib import admin
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.signals import post_init
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from model_bakery import baker
 from rest_framework import status
+from rest_framework.test import APIClient
 
+from movie.admin import CommentAdmin
 from movie.models import Comment, Film
+from movie.tasks import delete_rejected_comments
 from movie.views import CommentNestedViewSet
 
 
@@ -173,3 +186,268 @@ class TestPublicFilmCommentsAPI:
 
         assert len(response.data["results"]) == 1
         assert response.data["results"][0]["text"] == comment.text
+
+
+@pytest.mark.django_db
+class TestFilmCommentCount:
+    def test_creating_approved_comment_increments_count(self):
+        film = baker.make(Film)
+        baker.make(Comment, film=film, status=Comment.STATUS_APPROVED)
+        baker.make(Comment, film=film, status=Comment.STATUS_PENDING)
+
+        film.refresh_from_db()
+        assert film.comment_count == 1
+
+    def test_status_change_updates_count(self):
+        film = baker.make(Film)
+        comment = baker.make(Comment, film=film)
+
+        comment = Comment.objects.get(id=comment.id)
+        comment.status = Comment.STATUS_APPROVED
+        comment.save()
+        film.refresh_from_db()
+        assert film.comment_count == 1
+
+        comment.status = Comment.STATUS_REJECTED
+        comment.save()
+        film.refresh_from_db()
+        assert film.comment_count == 0
+
+    def test_cascade_delete_of_approved_replies_updates_count(self):
+        film = baker.make(Film)
+        parent = baker.make(
+            Comment,
+            film=film,
+            status=Comment.STATUS_REJECTED
+        )
+        baker.make(
+            Comment,
+            film=film,
+            parent=parent,
+            status=Comment.STATUS_APPROVED
+        )
+
+        delete_rejected_comments()
+
+        film.refresh_from_db()
+        assert film.comment_count == 0
+
+    def test_admin_bulk_actions_update_count(self, rf):
+        film = baker.make(Film)
+        comments = baker.make(Comment, film=film, _quantity=3)
+
+        model_admin = CommentAdmin(Comment, admin.site)
+        model_admin.make_approved(rf.post("/"), Comment.objects.all())
+        film.refresh_from_db()
+        assert film.comment_count == 3
+
+        model_admin.make_rejected(
+            rf.post("/"),
+            Comment.objects.filter(id=comments[0].id)
+        )
+        film.refresh_from_db()
+        assert film.comment_count == 2
+
+    def test_reconcile_command_repairs_drift(self):
+        film = baker.make(Film)
+        baker.make(Comment, film=film, status=Comment.STATUS_APPROVED)
+        Film.objects.filter(id=film.id).update(comment_count=42)
+
+        call_command("reconcile_comment_counts", stdout=StringIO())
+
+        film.refresh_from_db()
+        assert film.comment_count == 1
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentCommentVotes:
+    def vote_concurrently(self, urls):
+        barrier = threading.Barrier(len(urls))
+
+        def vote(url):
+            client = APIClient()
+            barrier.wait()
+            try:
+                return client.post(url).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+            return list(executor.map(vote, urls))
+
+    def test_concurrent_votes_are_counted_exactly(self):
+        film = baker.make(Film)
+        comment = baker.make(
+            Comment,
+            film=film,
+            status=Comment.STATUS_APPROVED
+        )
+        like_url = film_url(film.id) + f"comments/{comment.id}/like/"
+        dislike_url = film_url(film.id) + f"comments/{comment.id}/dislike/"
+
+        codes = self.vote_concurrently([like_url] * 30 + [dislike_url] * 10)
+
+        assert codes == [status.HTTP_200_OK] * 40
+        comment.refresh_from_db()
+        assert comment.like_count == 30
+        assert comment.dislike_count == 10
+
+
+@pytest.mark.django_db
+class TestFilmCommentThreads:
+    def make_thread(self, film, depth, status=Comment.STATUS_APPROVED):
+        parent = baker.make(Comment, film=film, status=status)
+        root = parent
+        for _ in range(depth):
+            parent = baker.make(
+                Comment,
+                film=film,
+                parent=parent,
+                status=status
+            )
+        return root
+
+    def test_thread_is_nested_in_memory(self, api_client):
+        film = baker.make(Film)
+        root = self.make_thread(film, depth=3)
+
+        response = api_client.get(film_url(film.id) + "comments/")
+
+        comment = response.data["results"][0]
+        assert comment["id"] == root.id
+        for _ in range(3):
+            assert len(comment["replies"]) == 1
+            comment = comment["replies"][0]
+        assert comment["replies"] == []
+
+    @override_settings(COMMENT_REPLIES_DEPTH=3)
+    def test_query_count_is_bounded_by_preview_depth(
+            self,
+            api_client,
+            django_assert_num_queries):
+        film = baker.make(Film)
+        self.make_thread(film, depth=2)
+        self.make_thread(film, depth=8)
+
+        # count, top-level comments, three reply levels, deeper counts
+        with django_assert_num_queries(6):
+            response = api_client.get(film_url(film.id) + "comments/")
+
+        comment = response.data["results"][0]
+        for _ in range(3):
+            comment = comment["replies"][0]
+        assert comment["replies"] == []
+        assert comment["reply_count"] == 1
+
+    @override_settings(COMMENT_REPLIES_PREVIEW=2, COMMENT_REPLIES_DEPTH=3)
+    def test_only_previewed_replies_are_loaded(self, api_client):
+        film = baker.make(Film)
+        root = baker.make(Comment, film=film, status=Comment.STATUS_APPROVED)
+        replies = baker.make(
+            Comment,
+            film=film,
+            parent=root,
+            status=Comment.STATUS_APPROVED,
+            _quantity=200
+        )
+        self.make_thread(film, depth=0)
+        parent = replies[0]
+        for _ in range(50):
+            parent = baker.make(
+                Comment,
+                film=film,
+                parent=parent,
+                status=Comment.STATUS_APPROVED
+            )
+
+        loaded = []
+
+        def count_loaded(instance, **kwargs):
+            loaded.append(instance.id)
+
+        post_init.connect(count_loaded, sender=Comment)
+        try:
+            response = api_client.get(film_url(film.id) + "comments/")
+        finally:
+            post_init.disconnect(count_loaded, sender=Comment)
+
+        assert response.data["results"][-1]["reply_count"] == 200
+        # two top-level comments, two replies, then one reply per level
+        assert len(loaded) == 6
+
+    def test_hidden_replies_are_not_shown(self, api_client):
+        film = baker.make(Film)
+        root = baker.make(Comment, film=film, status=Comment.STATUS_APPROVED)
+        baker.make(
+            Comment,
+            film=film,
+            parent=root,
+            status=Comment.STATUS_REJECTED
+        )
+
+        response = api_client.get(film_url(film.id) + "comments/")
+
+        assert response.data["results"][0]["replies"] == []
+
+    @override_settings(COMMENT_REPLIES_PREVIEW=2)
+    def test_replies_are_bounded_with_reply_count(self, api_client):
+        film = baker.make(Film)
+        root = baker.make(Comment, film=film, status=Comment.STATUS_APPROVED)
+        baker.make(
+            Comment,
+            film=film,
+            parent=root,
+            status=Comment.STATUS_APPROVED,
+            _quantity=5
+        )
+
+        response = api_client.get(film_url(film.id) + "comments/")
+
+        comment = response.data["results"][0]
+        assert len(comment["replies"]) == 2
+        assert comment["reply_count"] == 5
+        assert comment["replies"][0]["reply_count"] == 0
+
+    @override_settings(COMMENT_REPLIES_PREVIEW=2)
+    def test_replies_endpoint_pages_through_all_replies(self, api_client):
+        film = baker.make(Film)
+        root = baker.make(Comment, film=film, status=Comment.STATUS_APPROVED)
+        replies = baker.make(
+            Comment,
+            film=film,
+            parent=root,
+            status=Comment.STATUS_APPROVED,
+            _quantity=7
+        )
+        nested = baker.make(
+            Comment,
+            film=film,
+            parent=replies[0],
+            status=Comment.STATUS_APPROVED
+        )
+
+        ids = []
+        url = film_url(film.id) + f"comments/{root.id}/replies/?limit=3"
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            ids += [reply["id"] for reply in response.data["results"]]
+            url = response.data["next"]
+
+        assert ids == [reply.id for reply in replies]
+        first_page = api_client.get(
+            film_url(film.id) + f"comments/{root.id}/replies/"
+        )
+        assert first_page.data["results"][0]["replies"][0]["id"] == nested.id
+
+    def test_user_columns_are_limited_to_the_serializer(self, api_client):
+        film = baker.make(Film)
+        self.make_thread(film, depth=1)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(film_url(film.id) + "comments/")
+
+        assert response.data["results"][0]["user"]["username"]
+        sql = " ".join(query["sql"] for query in queries)
+        assert "username" in sql
+        assert "password" not in sql
@@ -1,15 +1,36 @@
+import csv
+import json
+from array import array
+from datetime import timedelta
+
 import pytest
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from model_bakery import baker
 from rest_framework import status
 
-from movie import models
+from core.generations import bump_generations
+from movie import models, serializers
+from movie.caching import CATALOG_GENERATION, get_film_version
+from movie.film_index import get_film_index, intersect
+from movie.tasks import (
+    compute_similar_films,
+    decay_film_popularity,
+    flush_visit_counts,
+)
 from movie.views import FilmViewSet
+from movie.visits import apply_visit_batch, apply_visit_counts
 
 FILMS_URL = reverse("movie:films-list")
 
 
+def film_url(film_id):
+    return reverse("movie:films-detail", args=[film_id])
+
+
 @pytest.fixture
 def sample_film_data():
     def get_sample_film_data(**kwargs):
@@ -84,3 +105,1080 @@ class TestPrivateFilmAPI:
             response = api_client.post(FILMS_URL, missing_field_payload)
             assert response.status_code == status.HTTP_400_BAD_REQUEST
             assert models.Film.objects.count() == 0
+
+
+@pytest.mark.django_db
+class TestFilmRelatedIds:
+    def test_ids_are_resolved_in_one_query(self, sample_film_data):
+        actors = baker.make(models.Actor, _quantity=20)
+        payload = {
+            **sample_film_data(),
+            "actors": [actor.id for actor in actors],
+            "original_languages": [baker.make(models.Language).id],
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            serializer = serializers.FilmSavingSerializer(data=payload)
+            assert serializer.is_valid(), serializer.errors
+
+        assert serializer.validated_data["actors"] == actors
+        actor_queries = [
+            query for query in queries if '"movie_actor"' in query["sql"]
+        ]
+        assert len(actor_queries) == 1
+
+    def test_missing_id_is_reported(self, sample_film_data):
+        actor = baker.make(models.Actor)
+        payload = {**sample_film_data(), "actors": [actor.id, actor.id + 1]}
+
+        serializer = serializers.FilmSavingSerializer(data=payload)
+
+        assert not serializer.is_valid()
+        assert str(actor.id + 1) in serializer.errors["actors"][0]
+
+    def test_invalid_id_is_reported(self, sample_film_data):
+        payload = {**sample_film_data(), "genres": ["abc"]}
+
+        serializer = serializers.FilmSavingSerializer(data=payload)
+
+        assert not serializer.is_valid()
+        assert "genres" in serializer.errors
+
+
+@pytest.mark.django_db
+class TestFilmUpdate:
+    @pytest.fixture
+    def film(self):
+        film = baker.make(models.Film, director=baker.make(models.Director))
+        film.genres.add(baker.make(models.Genre))
+        film.actors.add(*baker.make(models.Actor, _quantity=3))
+        return film
+
+    def update(self, film, **data):
+        serializer = serializers.FilmSavingSerializer(
+            models.Film.objects.get(pk=film.pk),
+            data=data,
+            partial=True
+        )
+        assert serializer.is_valid(), serializer.errors
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save()
+        return [
+            query["sql"] for query in queries
+            if not query["sql"].startswith(("SELECT", "SAVEPOINT", "RELEASE"))
+        ]
+
+    def test_unchanged_data_writes_nothing(self, film):
+        version = get_film_version(film.pk)
+
+        writes = self.update(
+            film,
+            title=film.title,
+            director=film.director_id,
+            genres=[genre.id for genre in film.genres.all()],
+            actors=[actor.id for actor in film.actors.all()],
+        )
+
+        assert writes == []
+        assert get_film_version(film.pk) == version
+
+    def test_update_names_only_changed_columns(self, film):
+        writes = self.update(film, title="new", duration=film.duration)
+
+        # The save, then the search document refresh.
+        save, _ = [
+            sql for sql in writes if sql.startswith('UPDATE "movie_film"')
+        ]
+        columns = save.split(" SET ")[1].split(" WHERE ")[0]
+        assert '"title"' in columns
+        assert '"last_update_date"' in columns
+        for column in ('"duration"', '"description"', '"imdb_link"'):
+            assert column not in columns
+
+    def test_cast_change_refreshes_search_document(self, film):
+        added = baker.make(models.Actor, full_name_en="newcomer")
+
+        self.update(film, actors=[added.id])
+
+        film.refresh_from_db()
+        assert "newcomer" in film.search_document
+
+    def test_only_changed_relation_rows_are_written(self, film):
+        kept = list(film.actors.through.objects.filter(film=film)[:2])
+        added = baker.make(models.Actor)
+        version = get_film_version(film.pk)
+
+        writes = self.update(
+            film,
+            actors=[row.actor_id for row in kept] + [added.id]
+        )
+
+        rows = film.actors.through.objects.filter(film=film)
+        assert {row.pk for row in rows} >= {row.pk for row in kept}
+        assert {row.actor_id for row in rows} == \
+            {row.actor_id for row in kept} | {added.id}
+        assert get_film_version(film.pk) != version
+        assert any(sql.startswith("DELETE") for sql in writes)
+        assert any(sql.startswith("INSERT") for sql in writes)
+
+
+@pytest.mark.django_db
+class TestFilmBulk:
+    url = FILMS_URL + "bulk/"
+
+    @pytest.fixture(autouse=True)
+    def staff(self, api_client):
+        user = baker.make(get_user_model(), is_staff=True)
+        api_client.force_authenticate(user=user)
+        return user
+
+    @pytest.fixture
+    def payload(self):
+        director = baker.make(models.Director)
+        genre = baker.make(models.Genre)
+        country = baker.make(models.Country)
+        language = baker.make(models.Language)
+        actors = baker.make(models.Actor, _quantity=3)
+
+        def make_payload(count):
+            return [
+                {
+                    "title": f"فیلم {number}",
+                    "title_en": f"Film {number}",
+                    "year": 2000 + number,
+                    "description": "description",
+                    "imdb_rating": 7.5,
+                    "imdb_link": f"https://www.imdb.com/title/tt{number}",
+                    "director": director.id,
+                    "genres": [genre.id],
+                    "countries": [country.id],
+                    "original_languages": [language.id],
+                    "actors": [actor.id for actor in actors],
+                }
+                for number in range(count)
+            ]
+
+        return make_payload
+
+    def test_user_is_not_admin(self, api_client, payload):
+        api_client.force_authenticate(
+            user=baker.make(get_user_model(), is_staff=False)
+        )
+
+        response = api_client.post(self.url, payload(1), format="json")
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_create_films(self, api_client, payload, staff):
+        response = api_client.post(self.url, payload(3), format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert [item["title_en"] for item in response.data] == \
+            ["Film 0", "Film 1", "Film 2"]
+        film = models.Film.objects.get(pk=response.data[1]["id"])
+        assert film.user == staff
+        assert film.actors.count() == 3
+        assert film.last_update_date is not None
+
+    def test_query_count_does_not_grow_with_films(
+            self,
+            api_client,
+            payload):
+        counts = []
+        for count in (2, 8):
+            with CaptureQueriesContext(connection) as queries:
+                api_client.post(self.url, payload(count), format="json")
+            counts.append(len(queries))
+
+        assert counts[0] == counts[1]
+
+    def test_invalid_item_rejects_the_batch(self, api_client, payload):
+        films = payload(3)
+        films[1]["genres"] = [0]
+
+        response = api_client.post(self.url, films, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data[0] == {}
+        assert "genres" in response.data[1]
+        assert models.Film.objects.count() == 0
+
+    def test_update_films(self, api_client, payload):
+        created = api_client.post(self.url, payload(2), format="json").data
+        version = get_film_version(created[1]["id"])
+
+        response = api_client.patch(self.url, [
+            {"id": created[0]["id"], "title": "عنوان تازه", "actors": []},
+            {"id": created[1]["id"], "title": created[1]["title"]},
+        ], format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        first = models.Film.objects.get(pk=created[0]["id"])
+        assert first.title == "عنوان تازه"
+        assert first.actors.count() == 0
+        assert get_film_version(created[1]["id"]) == version
+
+    def test_update_unknown_film(self, api_client, payload):
+        created = api_client.post(self.url, payload(1), format="json").data
+
+        response = api_client.patch(self.url, [
+            {"id": created[0]["id"], "title": "عنوان تازه"},
+            {"id": created[0]["id"] + 1, "title": "عنوان تازه"},
+        ], format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "id" in response.data[1]
+        assert models.Film.objects.get().title == created[0]["title"]
+
+
+@pytest.mark.django_db
+class TestPublicFilmAPI:
+    def test_list_returns_film_cards(self, api_client):
+        film = baker.make(models.Film)
+        film.genres.add(baker.make(models.Genre))
+
+        response = api_client.get(FILMS_URL)
+
+        assert response.status_code == status.HTTP_200_OK
+        card = response.data["results"][0]
+        assert set(card) == set(serializers.FilmCardSerializer.Meta.fields)
+        assert len(card["genres"]) == 1
+
+    def test_list_query_count_does_not_grow_with_page(
+            self,
+            api_client,
+            django_assert_num_queries):
+        for film in baker.make(models.Film, _quantity=5):
+            film.genres.add(baker.make(models.Genre))
+
+        # count, films page, genres prefetch
+        with django_assert_num_queries(3):
+            api_client.get(FILMS_URL)
+
+    def test_retrieve_returns_full_film(self, api_client):
+        film = baker.make(models.Film)
+
+        response = api_client.get(film_url(film.id))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "description" in response.data
+        assert "links" in response.data
+
+
+@pytest.mark.django_db
+class TestFilmProjection:
+    def get_sql(self, api_client, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        return response, " ".join(query["sql"] for query in queries)
+
+    def test_list_skips_columns_cards_do_not_show(self, api_client):
+        film = baker.make(models.Film)
+        film.genres.add(baker.make(models.Genre))
+
+        response, sql = self.get_sql(api_client, FILMS_URL)
+
+        assert response.data["results"][0]["title"] == film.title
+        assert '"movie_film"."description"' not in sql
+
+    def test_prefetched_relations_are_projected(self, api_client):
+        film = baker.make(models.Film, director=baker.make(models.Director))
+        link = baker.make(models.Link, film=film)
+        link.languages.add(baker.make(models.Language))
+
+        response, sql = self.get_sql(
+            api_client,
+            FILMS_URL + "?fields=title&expand=director,links"
+        )
+
+        item = response.data["results"][0]
+        assert item["links"][0]["url"] == link.url
+        assert len(item["links"][0]["languages"]) == 1
+        assert item["director"]["full_name"] == film.director.full_name
+        assert '"movie_link"."created_date"' not in sql
+        assert '"movie_director"."full_name"' in sql
+        assert '"movie_film"."title_en"' not in sql
+
+
+@pytest.mark.django_db
+class TestSerialSeasons:
+    @pytest.fixture
+    def serial(self):
+        serial = baker.make(models.Film, is_serial=True)
+        for episode in (1, 2):
+            for quality in (models.Link.QUALITY_1080P,
+                            models.Link.QUALITY_720P):
+                baker.make(
+                    models.Link,
+                    film=serial,
+                    season=1,
+                    episode=episode,
+                    quality=quality
+                )
+        baker.make(models.Link, film=serial, season=2, episode=1)
+        baker.make(models.Link, film=serial)
+        return serial
+
+    def test_detail_summarizes_seasons(self, api_client, serial):
+        response = api_client.get(film_url(serial.id))
+
+        assert len(response.data["links"]) == 1
+        assert response.data["seasons"] == [
+            {
+                "season": 1,
+                "episode_count": 2,
+                "qualities": [models.Link.QUALITY_720P,
+                              models.Link.QUALITY_1080P],
+            },
+            {
+                "season": 2,
+                "episode_count": 1,
+                "qualities": [models.Link.QUALITY_720P],
+            },
+        ]
+
+    def test_films_have_no_seasons(self, api_client):
+        film = baker.make(models.Film)
+        baker.make(models.Link, film=film)
+
+        response = api_client.get(film_url(film.id))
+
+        assert len(response.data["links"]) == 1
+        assert response.data["seasons"] == []
+
+    def test_list_loads_summaries_once(
+            self,
+            api_client,
+            serial,
+            django_assert_num_queries):
+        baker.make(models.Link, film=baker.make(models.Film, is_serial=True),
+                   season=1, episode=1)
+
+        # count, films page, links prefetch, languages prefetch, season
+        # counts, season qualities
+        with django_assert_num_queries(6):
+            response = api_client.get(
+                FILMS_URL,
+                {"fields": "id", "expand": "links,seasons"}
+            )
+
+        assert {len(item["seasons"]) for item in response.data["results"]} \
+            == {1, 2}
+
+
+@pytest.mark.django_db
+class TestFilmCursorPagination:
+    def collect_pages(self, api_client, url):
+        ids = []
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            ids += [film["id"] for film in response.data["results"]]
+            url = response.data["next"]
+        return ids
+
+    def test_pages_through_ties_without_duplicates(self, api_client):
+        films = baker.make(models.Film, imdb_rating=7.5, _quantity=7)
+        films += baker.make(models.Film, imdb_rating=8.0, _quantity=4)
+
+        ids = self.collect_pages(
+            api_client,
+            FILMS_URL + "?pagination=cursor&ordering=-imdb_rating&limit=3"
+        )
+
+        expected = sorted(films, key=lambda f: (-f.imdb_rating, -f.id))
+        assert ids == [film.id for film in expected]
+
+    def test_previous_link_returns_previous_page(self, api_client):
+        baker.make(models.Film, _quantity=6)
+
+        first = api_client.get(FILMS_URL + "?pagination=cursor&limit=2")
+        second = api_client.get(first.data["next"])
+        previous = api_client.get(second.data["previous"])
+
+        assert previous.data["results"] == first.data["results"]
+        assert previous.data["previous"] is None
+
+    def test_works_with_filters(self, api_client):
+        serials = baker.make(models.Film, is_serial=True, _quantity=3)
+        baker.make(models.Film, is_serial=False, _quantity=3)
+
+        ids = self.collect_pages(
+            api_client,
+            FILMS_URL + "?pagination=cursor&is_serial=true&limit=2"
+        )
+
+        assert sorted(ids) == sorted(film.id for film in serials)
+
+    def test_invalid_cursor_returns_404(self, api_client):
+        response = api_client.get(FILMS_URL + "?cursor=invalid")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestFilmSparseFieldsets:
+    def test_fields_limits_list_items(self, api_client):
+        baker.make(models.Film)
+
+        response = api_client.get(FILMS_URL + "?fields=title,imdb_rating")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data["results"][0]) == {
+            "id", "title", "imdb_rating"
+        }
+
+    def test_expand_adds_relations_to_list_items(self, api_client):
+        film = baker.make(models.Film)
+        film.actors.add(baker.make(models.Actor))
+
+        response = api_client.get(FILMS_URL + "?expand=actors,links")
+
+        card = response.data["results"][0]
+        assert len(card["actors"]) == 1
+        assert card["links"] == []
+        assert "genres" in card
+        assert "countries" not in card
+
+    def test_fields_on_detail_skips_prefetches(
+            self,
+            api_client,
+            django_assert_num_queries):
+        film = baker.make(models.Film)
+
+        with django_assert_num_queries(1):
+            response = api_client.get(
+                film_url(film.id) + "?fields=id,title,imdb_rating"
+            )
+
+        assert set(response.data) == {"id", "title", "imdb_rating"}
+
+    def test_unknown_fields_are_ignored(self, api_client):
+        film = baker.make(models.Film)
+
+        response = api_client.get(film_url(film.id) + "?fields=unknown")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "description" in response.data
+
+
+@pytest.mark.django_db
+class TestFilmVisitCount:
+    def test_visits_are_buffered_until_flush(self, api_client):
+        film = baker.make(models.Film, visit_count=10)
+
+        response = api_client.get(film_url(film.id))
+
+        film.refresh_from_db()
+        assert response.data["visit_count"] == 11
+        assert film.visit_count == 10
+
+        assert flush_visit_counts() == 1
+        film.refresh_from_db()
+        assert film.visit_count == 11
+
+    def test_repeated_visit_is_not_counted(self, api_client):
+        film = baker.make(models.Film)
+
+        api_client.get(film_url(film.id))
+        api_client.get(film_url(film.id))
+        flush_visit_counts()
+
+        film.refresh_from_db()
+        assert film.visit_count == 1
+
+    def test_retried_batch_is_applied_once(self):
+        first, second = baker.make(models.Film, _quantity=2)
+        counts = {first.id: 3, second.id: 5}
+
+        assert apply_visit_batch("batch-1", counts)
+        assert not apply_visit_batch("batch-1", counts)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert (first.visit_count, second.visit_count) == (3, 5)
+
+
+@pytest.mark.django_db
+class TestFilmSearch:
+    def search(self, api_client, term):
+        response = api_client.get(FILMS_URL, {"search": term})
+        assert response.status_code == status.HTTP_200_OK
+        return [film["id"] for film in response.data["results"]]
+
+    def test_arabic_and_persian_letters_match(self, api_client):
+        film = baker.make(models.Film, title="کریسمس یلدا")
+        baker.make(models.Film, title="other")
+
+        assert self.search(api_client, "كريسمس") == [film.id]
+
+    def test_zwnj_spellings_match(self, api_client):
+        film = baker.make(models.Film, title="می‌خواهم زنده بمانم")
+
+        assert self.search(api_client, "میخواهم") == [film.id]
+
+    def test_director_and_actor_names_match(self, api_client):
+        director = baker.make(models.Director, full_name_en="Asghar Farhadi")
+        directed = baker.make(models.Film, director=director)
+        acted = baker.make(models.Film)
+        acted.actors.add(baker.make(models.Actor, full_name_en="Taraneh"))
+
+        assert self.search(api_client, "farhadi") == [directed.id]
+        assert self.search(api_client, "TARANEH") == [acted.id]
+
+    def test_renaming_actor_updates_documents(self, api_client):
+        actor = baker.make(models.Actor, full_name="old")
+        film = baker.make(models.Film)
+        film.actors.add(actor)
+
+        actor.full_name = "renamed"
+        actor.save()
+
+        assert self.search(api_client, "renamed") == [film.id]
+
+    def test_title_matches_rank_first(self, api_client):
+        by_actor = baker.make(models.Film, title="x")
+        by_actor.actors.add(baker.make(models.Actor, full_name="heat"))
+        by_title = baker.make(models.Film, title="Heat")
+
+        assert self.search(api_client, "heat") == [by_title.id, by_actor.id]
+
+
+@pytest.mark.django_db
+class TestFilmDetailCache:
+    def test_cached_detail_costs_one_query(
+            self,
+            api_client,
+            django_assert_num_queries):
+        film = baker.make(models.Film)
+        api_client.get(film_url(film.id))
+
+        with django_assert_num_queries(1):
+            response = api_client.get(film_url(film.id))
+
+        assert response.data["title"] == film.title
+
+    def test_visit_count_is_not_cached(self, api_client):
+        film = baker.make(models.Film, visit_count=5)
+        api_client.get(film_url(film.id))
+
+        models.Film.objects.filter(id=film.id).update(visit_count=50)
+        response = api_client.get(film_url(film.id))
+
+        assert response.data["visit_count"] == 51
+
+    def test_film_update_invalidates_cache(self, api_client):
+        film = baker.make(models.Film, title="old")
+        api_client.get(film_url(film.id))
+
+        film.title = "new"
+        film.save()
+
+        assert api_client.get(film_url(film.id)).data["title"] == "new"
+
+    def test_relation_changes_invalidate_cache(self, api_client):
+        film = baker.make(models.Film)
+        api_client.get(film_url(film.id))
+
+        genre = baker.make(models.Genre)
+        genre.films.add(film)
+        assert len(api_client.get(film_url(film.id)).data["genres"]) == 1
+
+        baker.make(models.Link, film=film)
+        assert len(api_client.get(film_url(film.id)).data["links"]) == 1
+
+        genre.title = "renamed"
+        genre.save()
+        data = api_client.get(film_url(film.id)).data
+        assert data["genres"][0]["title"] == "renamed"
+
+    def test_comment_approval_invalidates_cache(self, api_client):
+        film = baker.make(models.Film)
+        comment = baker.make(models.Comment, film=film)
+        api_client.get(film_url(film.id))
+
+        comment.status = models.Comment.STATUS_APPROVED
+        comment.save()
+
+        assert api_client.get(film_url(film.id)).data["comment_count"] == 1
+
+    def test_drafts_are_not_served_from_staff_cache(
+            self,
+            api_client,
+            authenticate):
+        film = baker.make(models.Film, status=models.Film.STATUS_DRAFT)
+        authenticate(is_staff=True)
+        api_client.get(film_url(film.id))
+
+        api_client.force_authenticate(user=None)
+        response = api_client.get(film_url(film.id))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestFilmConditionalGet:
+    def test_detail_not_modified(self, api_client):
+        film = baker.make(models.Film)
+        response = api_client.get(film_url(film.id))
+
+        response = api_client.get(
+            film_url(film.id),
+            HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.has_header("ETag")
+
+    def test_detail_not_modified_still_counts_visit(self, api_client):
+        film = baker.make(models.Film, visit_count=0)
+        api_client.get(film_url(film.id))
+        etag = api_client.get(film_url(film.id))["ETag"]
+
+        api_client.get(film_url(film.id), HTTP_IF_NONE_MATCH=etag)
+        flush_visit_counts()
+
+        film.refresh_from_db()
+        assert film.visit_count == 1
+
+    def test_detail_modified_after_update(self, api_client):
+        film = baker.make(models.Film, title="old")
+        etag = api_client.get(film_url(film.id))["ETag"]
+
+        film.title = "new"
+        film.save()
+        response = api_client.get(film_url(film.id), HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["title"] == "new"
+        assert response["ETag"] != etag
+
+    def test_list_not_modified(self, api_client):
+        baker.make(models.Film, _quantity=2)
+        etag = api_client.get(FILMS_URL)["ETag"]
+
+        response = api_client.get(FILMS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_list_modified_after_new_film(self, api_client):
+        etag = api_client.get(FILMS_URL)["ETag"]
+
+        baker.make(models.Film)
+        response = api_client.get(FILMS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == 1
+
+    def test_list_modified_after_generation_bump_outside_request(
+            self,
+            api_client):
+        film = baker.make(models.Film, title="old")
+        etag = api_client.get(FILMS_URL)["ETag"]
+
+        # As a Celery task would: write without signals, then bump.
+        models.Film.objects.filter(pk=film.pk).update(title="new")
+        bump_generations(CATALOG_GENERATION)
+        response = api_client.get(FILMS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["results"][0]["title"] == "new"
+
+    @pytest.mark.parametrize("url, params", [
+        (FILMS_URL, {"ordering": "-visit_count"}),
+        (FILMS_URL + "trending/", {}),
+    ])
+    def test_visit_ordered_lists_modified_after_visit_flush(
+            self,
+            api_client,
+            url,
+            params):
+        film = baker.make(models.Film, visit_count=0)
+        etag = api_client.get(url, params)["ETag"]
+
+        api_client.get(film_url(film.id))
+        flush_visit_counts()
+        response = api_client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+
+    def test_list_etag_depends_on_query(self, api_client):
+        first = api_client.get(FILMS_URL)["ETag"]
+        second = api_client.get(FILMS_URL, {"ordering": "imdb_rating"})
+
+        assert second["ETag"] != first
+
+
+@pytest.mark.django_db
+class TestFilmLinkFilters:
+    def make_link(self, film, **kwargs):
+        kwargs.setdefault("size", 1000)
+        return baker.make(models.Link, film=film, **kwargs)
+
+    def test_filter_by_subtitle(self, api_client):
+        film = baker.make(models.Film)
+        self.make_link(film, subtitle=models.Link.SUBTITLE_PERSIAN_HARD_SUB)
+        other = baker.make(models.Film)
+        self.make_link(other, subtitle=models.Link.SUBTITLE_NO_SUB)
+
+        response = api_client.get(
+            FILMS_URL,
+            {"subtitle": models.Link.SUBTITLE_PERSIAN_HARD_SUB}
+        )
+
+        assert [item["id"] for item in response.data["results"]] \
+            == [film.id]
+
+    def test_subtitle_and_quality_match_the_same_link(self, api_client):
+        film = baker.make(models.Film)
+        self.make_link(
+            film,
+            subtitle=models.Link.SUBTITLE_PERSIAN_HARD_SUB,
+            quality=models.Link.QUALITY_1080P
+        )
+        mixed = baker.make(models.Film)
+        self.make_link(
+            mixed,
+            subtitle=models.Link.SUBTITLE_PERSIAN_HARD_SUB,
+            quality=models.Link.QUALITY_720P
+        )
+        self.make_link(
+            mixed,
+            subtitle=models.Link.SUBTITLE_NO_SUB,
+            quality=models.Link.QUALITY_1080P
+        )
+
+        response = api_client.get(FILMS_URL, {
+            "subtitle": models.Link.SUBTITLE_PERSIAN_HARD_SUB,
+            "quality": models.Link.QUALITY_1080P,
+        })
+
+        assert [item["id"] for item in response.data["results"]] \
+            == [film.id]
+
+    def test_filter_by_max_size(self, api_client):
+        film = baker.make(models.Film)
+        self.make_link(film, size=700)
+        self.make_link(film, size=2000)
+        other = baker.make(models.Film)
+        self.make_link(other, size=1500)
+
+        response = api_client.get(FILMS_URL, {"max_size": 1000})
+
+        assert [item["id"] for item in response.data["results"]] \
+            == [film.id]
+
+    def test_summaries_follow_link_changes(self):
+        film = baker.make(models.Film)
+        link = self.make_link(film, quality=models.Link.QUALITY_4K)
+        other = baker.make(models.Film)
+
+        link.film = other
+        link.save()
+        film.refresh_from_db()
+        other.refresh_from_db()
+        assert (film.link_flags, film.min_link_size) == (0, None)
+        assert other.link_flags and other.min_link_size == 1000
+
+        link.delete()
+        other.refresh_from_db()
+        assert (other.link_flags, other.min_link_size) == (0, None)
+
+
+@pytest.mark.django_db
+class TestFilmFacets:
+    url = reverse("movie:films-facets")
+
+    def test_facet_counts(self, api_client, django_assert_num_queries):
+        genre = baker.make(models.Genre)
+        baker.make(models.Film, year=1995, genres=[genre])
+        baker.make(models.Film, year=1999, genres=[genre], is_serial=True)
+        baker.make(models.Film, year=2004)
+        baker.make(models.Film, status=models.Film.STATUS_DRAFT)
+
+        with django_assert_num_queries(2):
+            response = api_client.get(self.url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == 3
+        assert response.data["genres"] == [
+            {"id": genre.id, "title": genre.title, "count": 2}
+        ]
+        assert response.data["decades"] == [
+            {"decade": 2000, "count": 1},
+            {"decade": 1990, "count": 2},
+        ]
+        assert response.data["is_serial"] == [
+            {"value": False, "count": 2},
+            {"value": True, "count": 1},
+        ]
+
+    def test_facets_follow_filters(self, api_client):
+        country = baker.make(models.Country)
+        baker.make(models.Film, is_serial=True, countries=[country])
+        baker.make(models.Film, is_serial=False, countries=[country])
+
+        response = api_client.get(self.url, {"is_serial": True})
+
+        assert response.data["count"] == 1
+        assert response.data["countries"][0]["count"] == 1
+
+    def test_facets_are_cached_until_catalog_changes(
+            self,
+            api_client,
+            django_assert_num_queries):
+        baker.make(models.Film)
+        api_client.get(self.url)
+
+        with django_assert_num_queries(0):
+            api_client.get(self.url, {"limit": 5})
+
+        baker.make(models.Film)
+        assert api_client.get(self.url).data["count"] == 2
+
+
+@pytest.mark.django_db
+class TestFilmIndex:
+    def test_filter_by_several_facets(self, api_client):
+        genre = baker.make(models.Genre)
+        country = baker.make(models.Country)
+        film = baker.make(models.Film, genres=[genre], countries=[country])
+        baker.make(models.Film, genres=[genre])
+        baker.make(models.Film, countries=[country])
+
+        response = api_client.get(
+            FILMS_URL,
+            {"genres": genre.id, "countries": country.id}
+        )
+
+        assert [item["id"] for item in response.data["results"]] \
+            == [film.id]
+        assert get_film_index().is_built
+
+    def test_index_follows_committed_changes(
+            self,
+            django_capture_on_commit_callbacks):
+        genre = baker.make(models.Genre)
+        film = baker.make(models.Film)
+        index = get_film_index()
+        assert index.lookup({"genres": [genre.id]}) == []
+
+        with django_capture_on_commit_callbacks(execute=True):
+            film.genres.add(genre)
+        assert index.lookup({"genres": [genre.id]}) == [film.id]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            film.status = models.Film.STATUS_DRAFT
+            film.save()
+        assert index.lookup({"genres": [genre.id]}) == []
+
+    def test_only_one_build_runs_at_a_time(
+            self,
+            django_assert_num_queries):
+        genre = baker.make(models.Genre)
+        index = get_film_index()
+
+        with index._build_lock:
+            with django_assert_num_queries(0):
+                assert index.lookup({"genres": [genre.id]}) is None
+        assert index.lookup({"genres": [genre.id]}) == []
+
+    def test_list_etag_follows_index_rebuild(self, api_client):
+        genre = baker.make(models.Genre)
+        film = baker.make(models.Film)
+        etag = api_client.get(FILMS_URL, {"genres": genre.id})["ETag"]
+
+        # Written by another process: no signal reaches this index.
+        models.Film.genres.through.objects.create(film=film, genre=genre)
+        get_film_index().build()
+        response = api_client.get(
+            FILMS_URL,
+            {"genres": genre.id},
+            HTTP_IF_NONE_MATCH=etag
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["id"] for item in response.data["results"]] \
+            == [film.id]
+
+    def test_staff_see_drafts(self, api_client, authenticate):
+        genre = baker.make(models.Genre)
+        draft = baker.make(
+            models.Film,
+            status=models.Film.STATUS_DRAFT,
+            genres=[genre]
+        )
+        authenticate(is_staff=True)
+
+        response = api_client.get(FILMS_URL, {"genres": genre.id})
+
+        assert [item["id"] for item in response.data["results"]] \
+            == [draft.id]
+
+    def test_intersect(self):
+        assert intersect([
+            array("I", [1, 3, 5, 7]),
+            array("I", [3, 4, 5]),
+            array("I", range(100)),
+        ]) == [3, 5]
+
+
+@pytest.mark.django_db
+class TestFilmTrending:
+    url = reverse("movie:films-trending")
+
+    def test_trending_order(self, api_client):
+        old = baker.make(models.Film, visit_count=1000)
+        recent = baker.make(models.Film)
+        apply_visit_counts({recent.id: 5, old.id: 1})
+
+        response = api_client.get(self.url)
+
+        assert [item["id"] for item in response.data["results"]] \
+            == [recent.id, old.id]
+
+    def test_films_without_recent_visits_are_not_trending(self, api_client):
+        baker.make(models.Film, visit_count=1000)
+
+        response = api_client.get(self.url)
+
+        assert response.data["count"] == 0
+
+    def test_decay_halves_popularity_every_half_life(self, settings):
+        settings.FILM_POPULARITY_HALF_LIFE = 60
+        settings.FILM_POPULARITY_DECAY_INTERVAL = 60
+        film = baker.make(models.Film)
+        faded = baker.make(models.Film)
+        apply_visit_counts({film.id: 10, faded.id: 1})
+        models.Film.objects.filter(id=faded.id).update(popularity=0.015)
+
+        decay_film_popularity()
+
+        film.refresh_from_db()
+        faded.refresh_from_db()
+        assert film.popularity == pytest.approx(5)
+        assert faded.popularity == 0
+
+    def test_decay_measures_time_since_the_stored_decay(self, settings):
+        settings.FILM_POPULARITY_HALF_LIFE = 60 * 60
+        film = baker.make(models.Film)
+        apply_visit_counts({film.id: 8})
+        models.PopularityDecay.objects.create(
+            pk=1,
+            decayed_date=timezone.now() - timedelta(hours=2)
+        )
+
+        decay_film_popularity()
+
+        film.refresh_from_db()
+        assert film.popularity == pytest.approx(2, rel=1e-3)
+        decay = models.PopularityDecay.objects.get()
+        assert timezone.now() - decay.decayed_date < timedelta(minutes=1)
+
+
+@pytest.mark.django_db
+class TestSimilarFilms:
+    @pytest.fixture
+    def catalog(self, settings):
+        settings.FILM_SIMILARITY = {"TOP_K": 2, "CHUNK_SIZE": 2}
+        drama, comedy = baker.make(models.Genre, _quantity=2)
+        director = baker.make(models.Director)
+        actor = baker.make(models.Actor)
+        film = baker.make(models.Film, genres=[drama], director=director)
+        closest = baker.make(
+            models.Film,
+            genres=[drama],
+            director=director,
+            actors=[actor]
+        )
+        close = baker.make(models.Film, genres=[drama])
+        other = baker.make(models.Film, genres=[comedy], actors=[actor])
+        return film, closest, close, other
+
+    def test_compute_top_neighbors(self, catalog):
+        film, closest, close, other = catalog
+
+        compute_similar_films()
+
+        assert list(
+            models.SimilarFilm.objects.filter(film=film)
+            .order_by("rank").values_list("similar_id", flat=True)
+        ) == [closest.id, close.id]
+        assert not models.SimilarFilm.objects.filter(similar=film) \
+            .exclude(film__in=[closest, close]).exists()
+
+    def test_similar_endpoint(self, api_client, catalog):
+        film, closest, close, other = catalog
+        compute_similar_films()
+        close.status = models.Film.STATUS_DRAFT
+        close.save()
+
+        response = api_client.get(
+            reverse("movie:films-similar", args=[film.id])
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["id"] for item in response.data] == [closest.id]
+
+    def test_recompute_drops_unpublished_films(self, catalog):
+        film, *_ = catalog
+        compute_similar_films()
+
+        film.status = models.Film.STATUS_DRAFT
+        film.save()
+        compute_similar_films()
+
+        assert not models.SimilarFilm.objects.filter(film=film).exists()
+        assert not models.SimilarFilm.objects.filter(similar=film).exists()
+
+
+@pytest.mark.django_db
+class TestFilmExport:
+    url = reverse("movie:films-export")
+
+    def test_user_is_not_admin(self, api_client, authenticate):
+        authenticate()
+
+        response = api_client.get(self.url)
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_export_ndjson(self, api_client, authenticate, settings):
+        settings.FILM_EXPORT_CHUNK_SIZE = 2
+        genre = baker.make(models.Genre)
+        films = baker.make(models.Film, genres=[genre], _quantity=3)
+        baker.make(models.Link, film=films[0], size=700)
+        authenticate(is_staff=True)
+
+        response = api_client.get(self.url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/x-ndjson"
+        records = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        assert [record["id"] for record in records] \
+            == [film.id for film in films]
+        assert records[0]["genres"] == [genre.title]
+        assert records[0]["links"][0]["size"] == 700
+
+    def test_export_csv(self, api_client, authenticate):
+        baker.make(models.Film, _quantity=2)
+        authenticate(is_staff=True)
+
+        response = api_client.get(self.url, {"type": "csv"})
+
+        rows = list(csv.reader(
+            b"".join(response.streaming_content).decode().splitlines()
+        ))
+        assert rows[0][0] == "title"
+        assert len(rows) == 3
+
+    def test_invalid_type(self, api_client, authenticate):
+        authenticate(is_staff=True)
+
+        response = api_client.get(self.url, {"type": "xml"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -85,3 +85,28 @@ class TestPrivateGenreAPI:
 
         assert response.status_code == status.HTTP_204_NO_CONTENT
         assert not Genre.objects.filter(id=genre.id).exists()
+
+
+@pytest.mark.django_db
+class TestGenreConditionalGet:
+    def test_list_not_modified(self, api_client):
+        baker.make(Genre)
+        response = api_client.get(GENRES_URL)
+
+        response = api_client.get(
+            GENRES_URL,
+            HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_list_modified_after_change(self, api_client):
+        genre = baker.make(Genre)
+        etag = api_client.get(GENRES_URL)["ETag"]
+
+        genre.title = "new"
+        genre.save()
+        response = api_client.get(GENRES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["results"][0]["title"] == "new"
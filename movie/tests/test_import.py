@@ -0,0 +1,234 @@
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DatabaseError
+from model_bakery import baker
+
+from movie import models
+from movie.management.commands.import_catalog import Command
+
+
+def film_record(**overrides):
+    record = {
+        "title": "پدرخوانده",
+        "title_en": "The Godfather",
+        "year": 1972,
+        "imdb_rating": 9.2,
+        "imdb_link": "https://www.imdb.com/title/tt0068646/",
+        "director": {
+            "full_name": "فرانسیس فورد کاپولا",
+            "full_name_en": "Francis Ford Coppola",
+        },
+        "actors": ["Marlon Brando", "Al Pacino"],
+        "genres": ["جنایی", "درام"],
+        "countries": ["آمریکا"],
+        "original_languages": ["انگلیسی"],
+        "links": [{
+            "url": "https://dl.example.com/godfather-1080.mkv",
+            "size": 2400,
+            "quality": models.Link.QUALITY_1080P,
+            "subtitle": models.Link.SUBTITLE_PERSIAN_HARD_SUB,
+            "languages": ["انگلیسی"],
+        }],
+    }
+    record.update(overrides)
+    return record
+
+
+@pytest.fixture
+def write_jsonl(tmp_path):
+    def do_write(*records):
+        path = tmp_path / "catalog.jsonl"
+        path.write_text(
+            "\n".join(json.dumps(record) for record in records),
+            encoding="utf-8"
+        )
+        return str(path)
+
+    return do_write
+
+
+@pytest.fixture
+def superuser():
+    return baker.make(get_user_model(), is_superuser=True)
+
+
+@pytest.mark.django_db
+class TestImportCatalog:
+    def test_import_films_with_relations(self, write_jsonl, superuser):
+        call_command("import_catalog", write_jsonl(film_record()))
+
+        film = models.Film.objects.get()
+        assert film.director.full_name_en == "Francis Ford Coppola"
+        assert film.director.full_name == "فرانسیس فورد کاپولا"
+        assert sorted(film.actors.values_list("full_name", flat=True)) \
+            == ["Al Pacino", "Marlon Brando"]
+        assert film.genres.count() == 2
+        assert film.links.get().languages.get().title == "انگلیسی"
+        assert film.user == superuser
+        # Derived data that signals keep in sync for single saves.
+        assert "godfather" in film.search_document
+        assert film.min_link_size == 2400
+
+    def test_rerun_updates_instead_of_duplicating(
+            self,
+            write_jsonl,
+            superuser):
+        call_command("import_catalog", write_jsonl(film_record()))
+
+        record = film_record(genres=["درام"], imdb_rating=9.0)
+        record["links"][0]["size"] = 2000
+        call_command("import_catalog", write_jsonl(record))
+
+        film = models.Film.objects.get()
+        assert film.imdb_rating == 9.0
+        assert list(film.genres.values_list("title", flat=True)) == ["درام"]
+        assert film.links.get().size == 2000
+        assert models.Genre.objects.count() == 2
+        assert models.Actor.objects.count() == 2
+
+    def test_reuses_existing_names(self, write_jsonl, superuser):
+        genre = baker.make(models.Genre, title="درام")
+
+        call_command(
+            "import_catalog",
+            write_jsonl(film_record(), film_record(
+                title_en="The Godfather Part II",
+                imdb_link="https://www.imdb.com/title/tt0071562/",
+            )),
+            batch_size=1
+        )
+
+        assert models.Film.objects.count() == 2
+        assert genre.films.count() == 2
+        assert models.Director.objects.count() == 1
+
+    def test_invalid_rows_are_skipped(self, write_jsonl, superuser, capsys):
+        call_command(
+            "import_catalog",
+            write_jsonl(film_record(), film_record(imdb_link=""))
+        )
+
+        assert models.Film.objects.count() == 1
+        assert "Line 2: missing imdb_link" in capsys.readouterr().err
+
+    @pytest.mark.parametrize("overrides, error", [
+        ({"year": 1500}, "invalid year"),
+        ({"imdb_rating": 11}, "invalid imdb_rating"),
+        ({"title": "x" * 256}, "invalid title"),
+        ({"imdb_link": "not a url"}, "invalid imdb_link"),
+        ({"links": [{"url": "https://dl.example.com/a.mkv", "size": -1}]},
+         "invalid size"),
+        ({"links": [{"url": "https://dl.example.com/a.mkv", "size": 1,
+                     "quality": "8K"}]},
+         "invalid quality"),
+        ({"links": [{"url": "https://dl.example.com/a.mkv", "size": 1,
+                     "season": -1, "episode": 1}]},
+         "invalid season"),
+    ])
+    def test_out_of_range_values_are_skipped(
+            self,
+            write_jsonl,
+            superuser,
+            capsys,
+            overrides,
+            error):
+        call_command(
+            "import_catalog",
+            write_jsonl(film_record(**overrides))
+        )
+
+        assert models.Film.objects.count() == 0
+        assert f"Line 1: {error}" in capsys.readouterr().err
+
+    def test_failed_batch_does_not_stop_the_import(
+            self,
+            write_jsonl,
+            superuser,
+            capsys,
+            monkeypatch):
+        import_batch = Command.import_batch
+        calls = []
+
+        def fail_first_batch(command, records, user):
+            calls.append(records)
+            if len(calls) == 1:
+                models.Genre.objects.create(title="rolled back")
+                raise DatabaseError("disk I/O error")
+            return import_batch(command, records, user)
+
+        monkeypatch.setattr(Command, "import_batch", fail_first_batch)
+        call_command(
+            "import_catalog",
+            write_jsonl(
+                film_record(),
+                film_record(imdb_link="https://www.imdb.com/title/tt1/")
+            ),
+            batch_size=1
+        )
+
+        assert models.Film.objects.count() == 1
+        assert not models.Genre.objects.filter(title="rolled back").exists()
+        assert "Lines 1-1: disk I/O error" in capsys.readouterr().err
+
+    def test_rerun_updates_episode_link_url(self, write_jsonl, superuser):
+        episode = {
+            "url": "https://dl.example.com/s1e1.mkv",
+            "size": 300,
+            "season": 1,
+            "episode": 1,
+        }
+        call_command(
+            "import_catalog",
+            write_jsonl(film_record(is_serial=True, links=[episode]))
+        )
+        link = models.Link.objects.get()
+
+        moved = {**episode, "url": "https://mirror.example.com/s1e1.mkv"}
+        call_command(
+            "import_catalog",
+            write_jsonl(film_record(is_serial=True, links=[moved]))
+        )
+
+        assert list(models.Link.objects.values_list("pk", "url")) \
+            == [(link.pk, moved["url"])]
+
+    def test_duplicate_episode_links_are_skipped(
+            self,
+            write_jsonl,
+            superuser,
+            capsys):
+        episode = {
+            "url": "https://dl.example.com/s1e1.mkv",
+            "size": 300,
+            "season": 1,
+            "episode": 1,
+        }
+        record = film_record(
+            is_serial=True,
+            links=[episode, {**episode, "url": episode["url"] + "?2"}]
+        )
+
+        call_command("import_catalog", write_jsonl(record))
+
+        assert models.Film.objects.count() == 0
+        assert "Line 1: duplicate episode links" in capsys.readouterr().err
+
+    def test_import_csv(self, tmp_path, superuser):
+        path = tmp_path / "catalog.csv"
+        path.write_text(
+            "title,title_en,year,imdb_rating,imdb_link,director,actors,"
+            "genres,countries,original_languages,links\n"
+            "پدرخوانده,The Godfather,1972,9.2,https://imdb.com/tt1,"
+            "Francis Ford Coppola,Marlon Brando|Al Pacino,جنایی|درام,"
+            "آمریکا,انگلیسی,\n",
+            encoding="utf-8"
+        )
+
+        call_command("import_catalog", str(path))
+
+        film = models.Film.objects.get()
+        assert film.actors.count() == 2
+        assert film.genres.count() == 2
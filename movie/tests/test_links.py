@@ -1,8 +1,12 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from model_bakery import baker
 from rest_framework import status
 
-from movie.models import Link
+from movie.caching import get_film_version
+from movie.models import Film, Language, Link
 
 LINKS_URL = "/api/links/"
 
@@ -24,3 +28,202 @@ class TestRetrieveLink:
         response = api_client.get(LINKS_URL + f"{link.id}/")
         assert response.status_code == status.HTTP_200_OK
         assert response.data["id"] == link.id
+
+
+@pytest.mark.django_db
+class TestSeasonLinkUpload:
+    @pytest.fixture
+    def serial(self):
+        return baker.make(Film, is_serial=True)
+
+    def url(self, film):
+        return reverse("movie:film-links-bulk", args=[film.id])
+
+    def manifest(self, episodes,
+                 qualities=(Link.QUALITY_720P, Link.QUALITY_1080P)):
+        language = baker.make(Language)
+        return {
+            "season": 2,
+            "subtitle": Link.SUBTITLE_PERSIAN_HARD_SUB,
+            "languages": [language.id],
+            "links": [
+                {
+                    "episode": episode,
+                    "quality": quality,
+                    "url": f"https://dl.example.com/s2e{episode}/{quality}",
+                    "size": 300,
+                }
+                for episode in range(1, episodes + 1)
+                for quality in qualities
+            ],
+        }
+
+    def test_user_is_not_admin(self, api_client, authenticate, serial):
+        authenticate(is_staff=False)
+
+        response = api_client.post(
+            self.url(serial),
+            self.manifest(1),
+            format="json"
+        )
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_upload_season(self, api_client, authenticate, serial):
+        authenticate(is_staff=True)
+        version = get_film_version(serial.id)
+
+        response = api_client.post(
+            self.url(serial),
+            self.manifest(3),
+            format="json"
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(response.data) == 6
+        links = Link.objects.filter(film=serial, season=2)
+        assert links.count() == 6
+        assert {link.subtitle for link in links} == \
+            {Link.SUBTITLE_PERSIAN_HARD_SUB}
+        assert Link.languages.through.objects \
+            .filter(link__film=serial).count() == 6
+        assert get_film_version(serial.id) != version
+
+    def test_query_count_does_not_grow_with_episodes(
+            self,
+            api_client,
+            authenticate):
+        authenticate(is_staff=True)
+
+        counts = []
+        for episodes in (2, 10):
+            serial = baker.make(Film, is_serial=True)
+            manifest = self.manifest(episodes)
+            with CaptureQueriesContext(connection) as queries:
+                api_client.post(self.url(serial), manifest, format="json")
+            counts.append(len(queries))
+
+        assert counts[0] == counts[1]
+
+    def test_duplicate_links_are_rejected(
+            self,
+            api_client,
+            authenticate,
+            serial):
+        authenticate(is_staff=True)
+        manifest = self.manifest(2)
+        manifest["links"].append(dict(manifest["links"][0]))
+        baker.make(
+            Link,
+            film=serial,
+            season=2,
+            episode=2,
+            quality=Link.QUALITY_1080P,
+            subtitle=Link.SUBTITLE_PERSIAN_HARD_SUB
+        )
+
+        response = api_client.post(self.url(serial), manifest, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        errors = response.data["links"]
+        assert [bool(error) for error in errors] == \
+            [False, False, False, True, True]
+        assert Link.objects.filter(film=serial).count() == 1
+
+    def test_films_are_rejected(self, api_client, authenticate):
+        authenticate(is_staff=True)
+        film = baker.make(Film, is_serial=False)
+
+        response = api_client.post(
+            self.url(film),
+            self.manifest(1),
+            format="json"
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "season" in response.data
+
+
+@pytest.mark.django_db
+class TestFilmEpisodeLinks:
+    @pytest.fixture
+    def serial(self):
+        serial = baker.make(
+            Film,
+            is_serial=True,
+            status=Film.STATUS_PUBLISHED
+        )
+        language = baker.make(Language)
+        for season in (1, 2):
+            for episode in (1, 2, 3):
+                for quality in (Link.QUALITY_720P, Link.QUALITY_1080P):
+                    link = baker.make(
+                        Link,
+                        film=serial,
+                        season=season,
+                        episode=episode,
+                        quality=quality
+                    )
+                    link.languages.add(language)
+        return serial
+
+    def url(self, film):
+        return reverse("movie:film-links-list", args=[film.id])
+
+    def test_links_are_grouped_by_episode(self, api_client, serial):
+        response = api_client.get(self.url(serial), {"season": 2})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == 3
+        episode = response.data["results"][0]
+        assert (episode["season"], episode["episode"]) == (2, 1)
+        assert {link["quality"] for link in episode["links"]} == \
+            {Link.QUALITY_720P, Link.QUALITY_1080P}
+
+    def test_pages_count_episodes(self, api_client, serial):
+        response = api_client.get(self.url(serial), {"limit": 2, "offset": 2})
+
+        assert [
+            (episode["season"], episode["episode"])
+            for episode in response.data["results"]
+        ] == [(1, 3), (2, 1)]
+        assert all(
+            len(episode["links"]) == 2 for episode in response.data["results"]
+        )
+
+    def test_query_count_does_not_grow_with_page(
+            self,
+            api_client,
+            serial,
+            django_assert_num_queries):
+        # film, count, episodes page, links, languages prefetch
+        with django_assert_num_queries(5):
+            api_client.get(self.url(serial), {"limit": 6})
+
+    def test_large_limit_is_capped(self, api_client):
+        serial = baker.make(Film, is_serial=True)
+        Link.objects.bulk_create(
+            Link(
+                film=serial,
+                url=f"https://dl.example.com/s1e{episode}",
+                size=300,
+                season=1,
+                episode=episode
+            )
+            for episode in range(1, 1301)
+        )
+
+        response = api_client.get(self.url(serial), {"limit": 1300})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == 1300
+        assert [episode["episode"] for episode in response.data["results"]] \
+            == list(range(1, 101))
+
+    def test_drafts_are_hidden(self, api_client, serial):
+        serial.status = Film.STATUS_DRAFT
+        serial.save()
+
+        response = api_client.get(self.url(serial))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
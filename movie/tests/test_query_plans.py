@@ -0,0 +1,135 @@
+"""
+Check with EXPLAIN that the hot read paths use the indexes declared in
+movie.models, so dropping or reordering one is caught.
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_bakery import baker
+
+from movie import models
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # Tiny test tables are cheaper to scan than to index.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN " + sql)
+        elif connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+        else:
+            pytest.skip(f"No query plan support for {connection.vendor}.")
+        return " ".join(str(row) for row in cursor.fetchall())
+
+
+def main_query_plans(api_client, url, table, params=None):
+    """Plans of the row-fetching queries the view runs against `table`."""
+    with CaptureQueriesContext(connection) as context:
+        response = api_client.get(url, params)
+    assert response.status_code == 200
+
+    return [
+        query_plan(query["sql"])
+        for query in context.captured_queries
+        if f'FROM "{table}"' in query["sql"]
+        and not query["sql"].startswith("SELECT COUNT(*)")
+    ]
+
+
+@pytest.mark.django_db
+class TestFilmQueryPlans:
+    @pytest.mark.parametrize("ordering, index", [
+        (None, "movie_film_status_update_idx"),
+        ("-imdb_rating", "movie_film_status_rating_idx"),
+        ("-visit_count", "movie_film_status_visits_idx"),
+        ("-popularity", "movie_film_status_popular_idx"),
+    ])
+    def test_catalog_pages_use_status_index(self, api_client, ordering,
+                                            index):
+        baker.make(models.Film, _quantity=3)
+        params = {"ordering": ordering} if ordering else None
+
+        plans = main_query_plans(
+            api_client,
+            reverse("movie:films-list"),
+            "movie_film",
+            params
+        )
+
+        assert plans
+        assert all(index in plan for plan in plans)
+
+    def test_trending_uses_popularity_index(self, api_client):
+        baker.make(models.Film, popularity=1, _quantity=3)
+
+        plans = main_query_plans(
+            api_client,
+            reverse("movie:films-trending"),
+            "movie_film"
+        )
+
+        assert plans
+        assert all("movie_film_status_popular_idx" in plan for plan in plans)
+
+
+@pytest.mark.django_db
+class TestCommentQueryPlans:
+    def test_comment_threads_use_thread_index(self, api_client):
+        film = baker.make(models.Film)
+        baker.make(
+            models.Comment,
+            film=film,
+            status=models.Comment.STATUS_APPROVED,
+            _quantity=2
+        )
+
+        plans = main_query_plans(
+            api_client,
+            reverse("movie:film-comments-list", args=[film.id]),
+            "movie_comment"
+        )
+
+        assert plans
+        assert "movie_comment_thread_idx" in plans[0]
+
+
+def unique_constraint_index(name):
+    """Name the query plan gives the index of a unique constraint."""
+    if connection.vendor == "sqlite":
+        # SQLite names the indexes of table constraints itself.
+        return "USING INDEX sqlite_autoindex_movie_link"
+    return name
+
+
+@pytest.mark.django_db
+class TestLinkQueryPlans:
+    @pytest.mark.parametrize("by_film", [True, False])
+    def test_link_lists_use_link_indexes(self, api_client, authenticate,
+                                         by_film):
+        film = baker.make(models.Film)
+        baker.make(
+            models.Link,
+            film=film,
+            size=100,
+            subtitle=models.Link.SUBTITLE_PERSIAN_HARD_SUB,
+            _quantity=2
+        )
+        authenticate(is_staff=True)
+        if by_film:
+            params = {"film": film.id}
+            index = unique_constraint_index("movie_link_unique_episode")
+        else:
+            params = {"subtitle": models.Link.SUBTITLE_PERSIAN_HARD_SUB}
+            index = "movie_link_subtitle_film_idx"
+
+        plans = main_query_plans(
+            api_client,
+            "/api/links/",
+            "movie_link",
+            params
+        )
+
+        assert plans
+        assert index in plans[0]
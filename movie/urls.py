@@ -20,6 +20,7 @@ films_router.register(
     views.CommentNestedViewSet,
     basename="film-comments"
 )
+films_router.register(r"links", views.FilmLinkViewSet, basename="film-links")
 
 urlpatterns = [
                   path("collections/", views.collection_list),
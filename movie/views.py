@@ -1,10 +1,27 @@
-from django.db.models import Count, ExpressionWrapper, F, IntegerField, Q
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Count,
+    ExpressionWrapper,
+    F,
+    IntegerField,
+    Prefetch,
+    Q,
+    Value,
+    Window,
+)
+from django.db.models.functions import Greatest, RowNumber
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from django_visit_count.utils import is_new_visit
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import status, mixins
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import OrderingFilter, SearchFilter
 from rest_framework.generics import (
     ListCreateAPIView,
@@ -18,7 +35,28 @@ from rest_framework.viewsets import (
     GenericViewSet
 )
 
-from . import serializers
+from core.conditional import (
+    check_conditional,
+    ConditionalGetMixin,
+    make_etag,
+    set_validators,
+)
+from core.generations import (
+    generation_datetime,
+    get_generation,
+    get_generations,
+)
+from core.projection import ProjectionMixin
+from . import export, serializers
+from .availability import season_summaries
+from .caching import (
+    CATALOG_GENERATION,
+    get_cached_facets,
+    get_cached_film_detail,
+    get_film_version,
+)
+from .facets import film_facets
+from .film_index import FACETS, get_film_index
 from .filters import CommentFilter, FilmFilter, LinkFilter
 from .models import (
     Actor,
@@ -31,7 +69,14 @@ from .models import (
     Language,
     Link,
 )
+from .pagination import (
+    CommentReplyPagination,
+    EpisodePagination,
+    FilmCursorPagination,
+)
 from .permissions import IsAdminOrReadOnly, IsAdminOrAuthenticatedOrReadOnly
+from .search import FilmSearchFilter
+from .visits import get_visit_buffer, VISITS_GENERATION
 
 
 @extend_schema(
@@ -48,13 +93,24 @@ from .permissions import IsAdminOrReadOnly, IsAdminOrAuthenticatedOrReadOnly
 @permission_classes([IsAdminOrReadOnly])
 def collection_list(request):
     if request.method == "GET":
+        generation = get_generation(Collection._meta.label_lower)
+        etag = make_etag(request, generation)
+        last_modified = generation_datetime(generation)
+        not_modified = check_conditional(request, etag, last_modified)
+        if not_modified is not None:
+            return set_validators(not_modified, etag, last_modified)
+
         queryset = Collection.objects.all()
         search_param = request.query_params.get("search")
         if search_param:
             queryset = queryset.filter(title__istartswith=search_param)
 
         serializer = serializers.CollectionSerializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return set_validators(
+            Response(serializer.data, status=status.HTTP_200_OK),
+            etag,
+            last_modified
+        )
 
     elif request.method == "POST":
         serializer = serializers.CollectionSerializer(data=request.data)
@@ -87,6 +143,12 @@ class CollectionDetail(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+def _split_param(value):
+    if not value:
+        return []
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
 @extend_schema(
     parameters=[
         OpenApiParameter(
@@ -104,67 +166,377 @@ class CollectionDetail(APIView):
                 Link.SUBTITLE_ENGLISH_HARD_SUB,
             ],
         ),
+        OpenApiParameter(
+            name="pagination",
+            type=str,
+            required=False,
+            description="برای صفحه بندی با نشانگر مقدار `cursor` را بفرستید.",
+            enum=[FilmCursorPagination.mode],
+        ),
+        OpenApiParameter(
+            name="fields",
+            type=str,
+            required=False,
+            description="فیلد های مورد نیاز، جدا شده با ویرگول",
+        ),
+        OpenApiParameter(
+            name="expand",
+            type=str,
+            required=False,
+            description="روابطی که باید به پاسخ اضافه شوند، جدا شده با ویرگول"
+                        " (director, genres, collections, actors, countries,"
+                        " original_languages, links, seasons)",
+        ),
     ],
 )
-class FilmViewSet(ModelViewSet):
-    filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
+class FilmViewSet(ProjectionMixin, ConditionalGetMixin, ModelViewSet):
+    filter_backends = [DjangoFilterBackend, OrderingFilter, FilmSearchFilter]
     filterset_class = FilmFilter
     ordering_fields = [
         "created_date",
         "last_update_date",
         "imdb_rating",
         "visit_count",
-        "comment_count"
+        "comment_count",
+        "popularity",
     ]
     ordering = ["-last_update_date"]
-    search_fields = ["title", "title_en"]
     permission_classes = [IsAdminOrReadOnly]
 
+    # Nested relations that are only loaded when a response includes them.
+    # Episodes of serials are listed by FilmLinkViewSet instead.
+    expandable_fields = {
+        "director": "director",
+        "genres": "genres",
+        "collections": "collections",
+        "actors": "actors",
+        "countries": "countries",
+        "original_languages": "original_languages",
+        "links": Prefetch(
+            "links",
+            queryset=Link.objects.filter(season__isnull=True)
+            .prefetch_related("languages")
+        ),
+        "seasons": None,
+    }
+    # Read by the visibility filter, keyset pagination and `seasons`.
+    projection_fields = ["status", "is_serial", *ordering_fields]
+    # `?type=` of the export action; `format` is taken by DRF's content
+    # negotiation.
+    export_types = {
+        "ndjson": (export.iter_ndjson, "application/x-ndjson"),
+        "csv": (export.iter_csv, "text/csv; charset=utf-8"),
+    }
+    # Actions listing films as cards.
+    card_actions = ("list", "trending", "similar")
+    # Query parameters that do not change which films are listed.
+    presentation_params = {
+        "ordering",
+        "fields",
+        "expand",
+        "pagination",
+        "cursor",
+        "limit",
+        "offset",
+    }
+
+    @property
+    def paginator(self):
+        # Clients opt into keyset pagination with `?pagination=cursor`;
+        # everyone else keeps the default limit/offset pages.
+        if not hasattr(self, "_paginator"):
+            request = getattr(self, "request", None)
+            if request is not None and self.action == "list" \
+                    and FilmCursorPagination.is_requested(request):
+                self._paginator = FilmCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_etag(self, request):
+        if self.action not in ("list", "trending", "facets"):
+            return None
+        generations = get_generations(*self.get_list_generations())
+        return make_etag(
+            request,
+            request.user.is_staff,
+            self.get_film_index_version(request),
+            *sorted(generations.items())
+        )
+
+    def get_film_index_version(self, request):
+        # Facet filters may be answered by this process' film index, which
+        # catches up with other processes' changes only when rebuilt.
+        index = get_film_index()
+        if index is None or request.user.is_staff \
+                or not FACETS.keys() & request.query_params.keys():
+            return None
+        index.ensure_fresh()
+        return index.version
+
+    def get_last_modified(self, request):
+        if self.action not in ("list", "trending", "facets"):
+            return None
+        return generation_datetime(
+            max(get_generations(*self.get_list_generations()).values())
+        )
+
+    def get_list_generations(self):
+        generations = [CATALOG_GENERATION]
+        ordering = self.request.query_params.get("ordering", "")
+        if self.action == "trending" or "visit_count" in ordering \
+                or "popularity" in ordering \
+                or "visit_count" in self.get_requested_fields():
+            generations.append(VISITS_GENERATION)
+        return generations
+
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
+        # Validators are checked only after the visit is counted, so a
+        # 304 still counts as a visit.
+        if self.is_sparse_request():
+            instance = self.get_object()
+        else:
+            instance = get_object_or_404(
+                self.get_visible_films()
+                    .only("id", "visit_count", "last_update_date"),
+                pk=kwargs[self.lookup_field]
+            )
+        visit_count = self.count_visit(instance)
+        with_visits = "visit_count" in self.get_requested_fields()
+
+        version = get_film_version(instance.pk)
+        self.etag = make_etag(
+            request,
+            version,
+            request.user.is_staff,
+            visit_count if with_visits else None
+        )
+        self.last_modified = max(
+            instance.last_update_date,
+            generation_datetime(version)
+        )
+        not_modified = check_conditional(
+            request,
+            self.etag,
+            self.last_modified
+        )
+        if not_modified is not None:
+            return not_modified
 
-        if is_new_visit(request, instance):
-            instance.visit_count = F("visit_count") + 1
-            instance.save(update_fields=["visit_count"])
+        if self.is_sparse_request():
+            data = self.get_serializer(instance).data
+        else:
+            # The full payload is cached per film; only the visit counter
+            # is read for every request.
+            data = get_cached_film_detail(
+                instance.pk,
+                request.user.is_staff,
+                build=lambda: self.get_serializer(self.get_object()).data,
+                version=version
+            )
 
-        return super().retrieve(request, *args, **kwargs)
+        if with_visits:
+            data = {**data, "visit_count": visit_count}
+        return Response(data)
+
+    @action(detail=True, methods=["GET"], pagination_class=None)
+    def similar(self, request, **kwargs):
+        """Precomputed recommendations for a film, most similar first."""
+        film = get_object_or_404(
+            self.get_visible_films().only("id"),
+            pk=kwargs[self.lookup_field]
+        )
+        queryset = self.get_queryset() \
+            .filter(similar_to__film=film) \
+            .order_by("similar_to__rank")
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="type",
+                type=str,
+                required=False,
+                enum=list(export_types),
+                description="قالب فایل خروجی؛ پیش فرض `ndjson`",
+            ),
+        ],
+        responses={(200, "application/x-ndjson"): OpenApiTypes.STR},
+    )
+    @action(
+        detail=False,
+        methods=["GET"],
+        permission_classes=[IsAdminUser],
+        pagination_class=None
+    )
+    def export(self, request):
+        """Stream the whole catalog with its relations."""
+        export_type = request.query_params.get("type", "ndjson")
+        if export_type not in self.export_types:
+            raise ValidationError({"type": ["قالب خروجی نامعتبر است."]})
+
+        stream, content_type = self.export_types[export_type]
+        queryset = self.filter_queryset(Film.objects.all())
+        response = StreamingHttpResponse(
+            stream(queryset),
+            content_type=content_type
+        )
+        response["Content-Disposition"] = \
+            f'attachment; filename="films.{export_type}"'
+        return response
+
+    @extend_schema(
+        request=serializers.FilmSavingSerializer(many=True),
+        responses=serializers.FilmSavingSerializer(many=True),
+    )
+    @action(
+        detail=False,
+        methods=["POST", "PATCH"],
+        permission_classes=[IsAdminUser],
+        pagination_class=None
+    )
+    def bulk(self, request):
+        """
+        Create many films, or partially update them with PATCH, in one
+        transaction. Nothing is written unless every item is valid; errors
+        are returned per item.
+        """
+        if request.method == "POST":
+            serializer = self.get_serializer(data=request.data, many=True)
+        else:
+            serializer = self.get_serializer(
+                Film.objects.all(),
+                data=request.data,
+                many=True,
+                partial=True
+            )
+        serializer.is_valid(raise_exception=True)
+        films = serializer.save()
+
+        saved = Film.objects.prefetch_related(*(
+            field.name for field in Film._meta.many_to_many
+        )).in_bulk([film.pk for film in films])
+        serializer = self.get_serializer(
+            [saved[film.pk] for film in films],
+            many=True
+        )
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if request.method == "POST"
+            else status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=["GET"])
+    def trending(self, request):
+        """Films ranked by recent, time-decayed visits."""
+        queryset = self.filter_queryset(self.get_queryset()) \
+            .filter(popularity__gt=0) \
+            .order_by("-popularity", "-id")
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    @action(detail=False, methods=["GET"], pagination_class=None)
+    def facets(self, request):
+        params = [
+            (name, values)
+            for name, values in request.query_params.lists()
+            if name not in self.presentation_params
+        ]
+        data = get_cached_facets(
+            params,
+            request.user.is_staff,
+            build=lambda: film_facets(
+                self.filter_queryset(self.get_visible_films())
+            )
+        )
+        return Response(data)
+
+    def count_visit(self, film):
+        visits = get_visit_buffer()
+        if is_new_visit(self.request, film):
+            visits.add(film.pk)
+        return film.visit_count + visits.pending(film.pk)
+
+    def get_visible_films(self):
+        if self.request.user.is_staff:
+            return Film.objects.all()
+        return Film.objects.filter(status=Film.STATUS_PUBLISHED)
+
+    def get_requested_fields(self):
+        """
+        Return the film fields to serialize for a read request, combining
+        the `fields` and `expand` query parameters with the action's
+        default representation.
+        """
+        params = self.request.query_params
+        available = set(serializers.FilmSerializer.Meta.fields)
+
+        if self.action in self.card_actions:
+            fields = set(serializers.FilmCardSerializer.Meta.fields)
+        else:
+            fields = available
+
+        sparse_fields = set(_split_param(params.get("fields"))) & available
+        if sparse_fields:
+            fields = sparse_fields | {"id"}
+
+        expand = set(_split_param(params.get("expand")))
+        return fields | (expand & set(self.expandable_fields))
+
+    def is_sparse_request(self):
+        params = self.request.query_params
+        return self.request.method in SAFE_METHODS \
+            and ("fields" in params or "expand" in params)
+
+    def get_serializer(self, *args, **kwargs):
+        if self.is_sparse_request():
+            kwargs["fields"] = self.get_requested_fields()
+        if args and self.request.method in SAFE_METHODS \
+                and "seasons" in self.get_requested_fields():
+            films = args[0] if kwargs.get("many") else [args[0]]
+            kwargs["context"] = {
+                **self.get_serializer_context(),
+                "season_summaries": season_summaries(
+                    [film.pk for film in films if film.is_serial]
+                ),
+            }
+        return super().get_serializer(*args, **kwargs)
 
     def get_serializer_class(self):
-        if self.request.method in SAFE_METHODS:
-            return serializers.FilmSerializer
-        return serializers.FilmSavingSerializer
+        if self.request.method not in SAFE_METHODS:
+            return serializers.FilmSavingSerializer
+        if self.action in self.card_actions \
+                and not self.is_sparse_request():
+            return serializers.FilmCardSerializer
+        return serializers.FilmSerializer
 
     def get_queryset(self):
-        queryset = Film.objects.select_related("director") \
-            .prefetch_related(
-            "actors",
-            "collections",
-            "genres",
-            "countries",
-            "original_languages",
-            "links__languages",
-        ).annotate(
-            comment_count=Count(
-                "comments",
-                filter=Q(comments__status=Comment.STATUS_APPROVED)
-            ),
-        )
-        if not self.request.user.is_staff:
-            queryset = queryset.filter(status=Film.STATUS_PUBLISHED)
+        queryset = self.get_visible_films()
 
-        subtitle = self.request.query_params.get("subtitle")
-        if subtitle:
-            films = Link.objects.filter(subtitle=subtitle) \
-                .values("film").distinct()
-            queryset = queryset.filter(id__in=films)
+        if self.request.method in SAFE_METHODS:
+            fields = self.get_requested_fields()
+        else:
+            fields = set(self.expandable_fields)
 
-        return queryset
+        for field in fields & set(self.expandable_fields):
+            lookup = self.expandable_fields[field]
+            if lookup is None:
+                continue
+            if field == "director":
+                queryset = queryset.select_related(lookup)
+            else:
+                queryset = queryset.prefetch_related(lookup)
+
+        return self.project_queryset(queryset)
 
     def get_serializer_context(self):
         return {"user": self.request.user}
 
 
-class LinkList(ListCreateAPIView):
+class LinkList(ProjectionMixin, ListCreateAPIView):
     queryset = Link.objects.prefetch_related("languages")
     serializer_class = serializers.LinkSerializer
     filter_backends = [DjangoFilterBackend, OrderingFilter]
@@ -173,13 +545,99 @@ class LinkList(ListCreateAPIView):
     permission_classes = [IsAdminUser]
 
 
-class LinkDetail(RetrieveUpdateDestroyAPIView):
+class LinkDetail(ProjectionMixin, RetrieveUpdateDestroyAPIView):
     queryset = Link.objects.prefetch_related("languages")
     serializer_class = serializers.LinkSerializer
     lookup_field = "id"
     permission_classes = [IsAdminUser]
 
 
+class FilmLinkViewSet(ProjectionMixin, GenericViewSet):
+    serializer_class = serializers.LinkNestedSerializer
+    pagination_class = EpisodePagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ["season"]
+    permission_classes = [IsAdminOrReadOnly]
+
+    @extend_schema(responses=serializers.EpisodeLinksSerializer(many=True))
+    def list(self, request, **kwargs):
+        """
+        The film's links grouped by episode; pages count episodes, not
+        links.
+        """
+        self.get_film()
+        links = self.filter_queryset(self.get_queryset())
+        episodes = links.prefetch_related(None) \
+            .values("season", "episode") \
+            .distinct().order_by("season", "episode")
+
+        page = self.paginate_queryset(episodes)
+        groups = {
+            (episode["season"], episode["episode"]): []
+            for episode in (episodes if page is None else page)
+        }
+        if groups:
+            # A page is a contiguous run of (season, episode) pairs, so
+            # matching seasons and episodes separately only adds the few
+            # links dropped below, and keeps the query size fixed.
+            seasons, episodes = zip(*groups)
+            condition = self.in_or_null("season", seasons) \
+                & self.in_or_null("episode", episodes)
+            for link in links.filter(condition):
+                if (link.season, link.episode) in groups:
+                    groups[link.season, link.episode].append(link)
+
+        serializer = serializers.EpisodeLinksSerializer([
+            {"season": season, "episode": episode, "links": episode_links}
+            for (season, episode), episode_links in groups.items()
+        ], many=True)
+        if page is None:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
+
+    @extend_schema(
+        request=serializers.SeasonLinksSerializer,
+        responses=serializers.LinkNestedSerializer(many=True),
+    )
+    @action(detail=False, methods=["POST"], permission_classes=[IsAdminUser])
+    def bulk(self, request, **kwargs):
+        """Create all the links of a serial's season in one request."""
+        film = self.get_film(Film.objects.only("id", "is_serial"))
+        serializer = serializers.SeasonLinksSerializer(
+            data=request.data,
+            context={"film": film}
+        )
+        serializer.is_valid(raise_exception=True)
+        links = serializer.save()
+
+        queryset = Link.objects.filter(pk__in=[link.pk for link in links]) \
+            .prefetch_related("languages") \
+            .order_by("episode", "quality", "subtitle")
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def in_or_null(field, values):
+        values = set(values)
+        condition = Q(**{f"{field}__in": values - {None}})
+        if None in values:
+            condition |= Q(**{f"{field}__isnull": True})
+        return condition
+
+    def get_film(self, queryset=None):
+        if queryset is None:
+            queryset = Film.objects.only("id")
+            if not self.request.user.is_staff:
+                queryset = queryset.filter(status=Film.STATUS_PUBLISHED)
+        return get_object_or_404(queryset, pk=self.kwargs["film_pk"])
+
+    def get_queryset(self):
+        queryset = Link.objects.filter(film_id=self.kwargs.get("film_pk")) \
+            .prefetch_related("languages") \
+            .order_by("season", "episode", "quality", "subtitle")
+        return self.project_queryset(queryset)
+
+
 class CommentViewSet(
     mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
@@ -204,8 +662,10 @@ class CommentViewSet(
         return {"user_id": self.request.user.id}
 
 
-class CommentNestedViewSet(ModelViewSet):
+class CommentNestedViewSet(ProjectionMixin, ModelViewSet):
     serializer_class = serializers.CommentNestedSerializer
+    # Threads are grouped by these columns.
+    projection_fields = ["parent", "film"]
     filter_backends = [OrderingFilter]
     ordering_fields = ["created_date", "like"]
     permission_classes = [IsAdminOrAuthenticatedOrReadOnly]
@@ -232,55 +692,140 @@ class CommentNestedViewSet(ModelViewSet):
         vote_type_count = f"{vote_type}_count"
         opp_vote_type_count = f"{opp_vote_type}_count"
 
+        changes = {}
         if not self.request.session.get(vote_session_key):
             self.request.session[vote_session_key] = True
-            setattr(
-                comment,
-                vote_type_count,
-                getattr(comment, vote_type_count) + 1
-            )
+            changes[vote_type_count] = 1
 
             if self.request.session.get(opp_vote_session_key):
                 del self.request.session[opp_vote_session_key]
-                setattr(
-                    comment,
-                    opp_vote_type_count,
-                    getattr(comment, opp_vote_type_count) - 1
-                )
+                changes[opp_vote_type_count] = -1
 
         else:
             del self.request.session[vote_session_key]
-            setattr(
-                comment,
-                vote_type_count,
-                getattr(comment, vote_type_count) - 1
+            changes[vote_type_count] = -1
+
+        # Update only the counter columns, relative to their stored values,
+        # so concurrent votes never overwrite each other.
+        comments = Comment.objects.filter(pk=comment.pk)
+        with transaction.atomic():
+            comments.update(**{
+                field: Greatest(F(field) + delta, Value(0))
+                for field, delta in changes.items()
+            })
+            counts = comments.values("like_count", "dislike_count").get()
+
+        return Response(counts, status=status.HTTP_200_OK)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_thread_serializer(page)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_thread_serializer(list(queryset))
+        return Response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        serializer = self.get_thread_serializer([instance])
+        return Response(serializer.data[0])
+
+    @extend_schema(responses=serializers.CommentNestedSerializer(many=True))
+    @action(
+        detail=True,
+        methods=["GET"],
+        pagination_class=CommentReplyPagination
+    )
+    def replies(self, request, **kwargs):
+        comment = self.get_object()
+
+        queryset = self.filter_visible(
+            Comment.objects.filter(parent_id=comment.id)
+        ).annotate(
+            like=self.net_likes()
+        ).select_related("user")
+        queryset = self.project_queryset(queryset)
+
+        page = self.paginate_queryset(self.filter_queryset(queryset))
+        serializer = self.get_thread_serializer(page)
+        return self.get_paginated_response(serializer.data)
+
+    def get_thread_serializer(self, comments):
+        """
+        Serialize comments together with a preview of their visible
+        replies. Replies are loaded one level at a time, keeping at most
+        COMMENT_REPLIES_PREVIEW replies per comment and counting the rest,
+        down to COMMENT_REPLIES_DEPTH levels below the given comments.
+        """
+        replies_by_parent = defaultdict(list)
+        reply_counts = {}
+
+        parent_ids = [comment.id for comment in comments]
+        for _ in range(settings.COMMENT_REPLIES_DEPTH):
+            if not parent_ids:
+                break
+            replies = self.filter_visible(
+                Comment.objects.filter(parent_id__in=parent_ids)
+            ).annotate(
+                like=self.net_likes(),
+                position=Window(
+                    RowNumber(),
+                    partition_by=[F("parent_id")],
+                    order_by=[F("created_date").asc(), F("id").asc()],
+                ),
+                sibling_count=Window(
+                    Count("id"),
+                    partition_by=[F("parent_id")]
+                ),
+            ).filter(
+                position__lte=settings.COMMENT_REPLIES_PREVIEW
+            ).select_related("user").order_by("created_date", "id")
+            replies = self.project_queryset(replies)
+
+            parent_ids = []
+            for reply in replies:
+                replies_by_parent[reply.parent_id].append(reply)
+                reply_counts[reply.parent_id] = reply.sibling_count
+                parent_ids.append(reply.id)
+
+        if parent_ids:
+            # Deeper replies are only counted; the replies endpoint lists
+            # them.
+            reply_counts.update(
+                self.filter_visible(
+                    Comment.objects.filter(parent_id__in=parent_ids)
+                ).order_by().values_list(
+                    "parent_id"
+                ).annotate(Count("id"))
             )
 
-        comment.save()
-        return Response(
-            {
-                "like_count": comment.like_count,
-                "dislike_count": comment.dislike_count
-            },
-            status=status.HTTP_200_OK
-        )
+        context = self.get_serializer_context()
+        context["replies"] = replies_by_parent
+        context["reply_counts"] = reply_counts
+        return self.get_serializer(comments, many=True, context=context)
 
     def get_queryset(self):
         film_id = self.kwargs.get("film_pk")
-        user = self.request.user
-
-        net_likes = ExpressionWrapper(
-            F("like_count") - F("dislike_count"),
-            output_field=IntegerField()
-        )
 
         queryset = (Comment.objects.filter(
-            film_id=film_id,
-            parent__isnull=True
+            film_id=film_id
         ).annotate(
-            like=net_likes
+            like=self.net_likes()
         ).select_related("user").order_by("-created_date"))
 
+        # Replies are listed through their parents, but can be fetched,
+        # voted on and moderated by id.
+        if self.action == "list":
+            queryset = queryset.filter(parent__isnull=True)
+
+        return self.project_queryset(self.filter_visible(queryset))
+
+    def filter_visible(self, queryset):
+        user = self.request.user
+
         if not user:
             return queryset.filter(status=Comment.STATUS_APPROVED)
         elif user.is_staff:
@@ -290,15 +835,31 @@ class CommentNestedViewSet(ModelViewSet):
                 Q(status=Comment.STATUS_APPROVED) | Q(user_id=user.id)
             )
 
+    @staticmethod
+    def net_likes():
+        return ExpressionWrapper(
+            F("like_count") - F("dislike_count"),
+            output_field=IntegerField()
+        )
+
     def get_serializer_context(self):
         return {"film_id": self.kwargs.get("film_pk"),
                 "user_id": self.request.user.id}
 
 
-class BaseAttrViewSet(ModelViewSet):
+class BaseAttrViewSet(ProjectionMixin, ConditionalGetMixin, ModelViewSet):
     filter_backends = [SearchFilter]
     permission_classes = [IsAdminOrReadOnly]
 
+    def get_etag(self, request):
+        return make_etag(request, self.get_generation())
+
+    def get_last_modified(self, request):
+        return generation_datetime(self.get_generation())
+
+    def get_generation(self):
+        return get_generation(self.queryset.model._meta.label_lower)
+
 
 class DirectorViewSet(BaseAttrViewSet):
     queryset = Director.objects.all()
@@ -0,0 +1,219 @@
+"""
+Write-behind film visit counting.
+
+Visits are accumulated outside the database and periodically written to
+``Film.visit_count`` in batches by the ``flush_visit_counts`` task, so a
+popular film's row is not locked by every page view.
+"""
+import threading
+import time
+import uuid
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.generations import bump_generations
+
+from .models import AppliedVisitBatch, Film
+
+UPDATE_BATCH_SIZE = 500
+VISITS_GENERATION = "film-visits"
+
+
+def apply_visit_counts(counts):
+    """
+    Add ``{film_id: visits}`` to the stored visit counters and popularity
+    scores.
+    """
+    film_ids = sorted(counts)
+    for start in range(0, len(film_ids), UPDATE_BATCH_SIZE):
+        chunk = film_ids[start:start + UPDATE_BATCH_SIZE]
+        increment = Case(
+            *[When(pk=film_id, then=Value(counts[film_id]))
+              for film_id in chunk],
+            default=Value(0),
+            output_field=PositiveIntegerField(),
+        )
+        Film.objects.filter(pk__in=chunk).update(
+            visit_count=F("visit_count") + increment,
+            popularity=F("popularity") + increment,
+        )
+    if film_ids:
+        bump_generations(VISITS_GENERATION)
+
+
+def apply_visit_batch(token, counts):
+    """
+    Apply a batch of visits exactly once; returns False if a batch with
+    the same token was already written.
+    """
+    try:
+        with transaction.atomic():
+            AppliedVisitBatch.objects.create(token=token)
+            apply_visit_counts(counts)
+    except IntegrityError:
+        return False
+
+    AppliedVisitBatch.objects.filter(
+        applied_date__lt=timezone.now() - timedelta(days=1)
+    ).delete()
+    return True
+
+
+class BaseVisitBuffer:
+    def add(self, film_id, count=1):
+        raise NotImplementedError
+
+    def pending(self, film_id):
+        """Visits of a film that are not written to the database yet."""
+        raise NotImplementedError
+
+    def flush(self):
+        """Write buffered visits and return the number of films updated."""
+        raise NotImplementedError
+
+
+class LocalVisitBuffer(BaseVisitBuffer):
+    """
+    In-process stand-in for development and tests. Buffered visits are
+    lost if the process dies, and they are flushed by the process itself
+    once the flush interval has passed.
+    """
+
+    def __init__(self, flush_interval=None):
+        self.flush_interval = flush_interval
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def add(self, film_id, count=1):
+        with self._lock:
+            self._counts[film_id] = self._counts.get(film_id, 0) + count
+            due = self.flush_interval is not None and \
+                time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def pending(self, film_id):
+        return self._counts.get(film_id, 0)
+
+    def flush(self):
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            self._last_flush = time.monotonic()
+        if counts:
+            apply_visit_counts(counts)
+        return len(counts)
+
+
+class RedisVisitBuffer(BaseVisitBuffer):
+    """
+    Accumulates visits in a Redis hash. A flush renames the hash to a
+    processing key tagged with a batch token before writing it, so a flush
+    that crashes half way is resumed, and never double counted, by the
+    next one. Flushes hold a lock, and the swap and the cleanup are atomic
+    scripts, so overlapping flushes never overwrite or delete a batch that
+    is not written yet.
+    """
+
+    # KEYS: pending, processing, batch; ARGV: a new batch token.
+    SWAP_SCRIPT = """
+    if redis.call('EXISTS', KEYS[2]) == 0 then
+        if redis.call('EXISTS', KEYS[1]) == 0 then
+            return false
+        end
+        redis.call('RENAME', KEYS[1], KEYS[2])
+        redis.call('SET', KEYS[3], ARGV[1])
+    end
+    local token = redis.call('GET', KEYS[3])
+    if not token then
+        token = ARGV[1]
+        redis.call('SET', KEYS[3], token)
+    end
+    return token
+    """
+    # KEYS: processing, batch; ARGV: the token of the written batch.
+    CLEANUP_SCRIPT = """
+    if redis.call('GET', KEYS[2]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1], KEYS[2])
+    end
+    return 0
+    """
+
+    def __init__(self, url, prefix="visits", lock_timeout=5 * 60):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.pending_key = f"{prefix}:pending"
+        self.processing_key = f"{prefix}:processing"
+        self.batch_key = f"{prefix}:batch"
+        self.lock_key = f"{prefix}:flush-lock"
+        self.lock_timeout = lock_timeout
+        self.swap = self.client.register_script(self.SWAP_SCRIPT)
+        self.cleanup = self.client.register_script(self.CLEANUP_SCRIPT)
+
+    def add(self, film_id, count=1):
+        self.client.hincrby(self.pending_key, film_id, count)
+
+    def pending(self, film_id):
+        with self.client.pipeline(transaction=False) as pipe:
+            pipe.hget(self.pending_key, film_id)
+            pipe.hget(self.processing_key, film_id)
+            return sum(int(value or 0) for value in pipe.execute())
+
+    def flush(self):
+        from redis.exceptions import LockError
+
+        lock = self.client.lock(self.lock_key, timeout=self.lock_timeout)
+        if not lock.acquire(blocking=False):
+            # Another flush is running; its batch is resumed if it dies.
+            return 0
+        try:
+            return self._flush()
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                pass
+
+    def _flush(self):
+        token = self.swap(
+            keys=[self.pending_key, self.processing_key, self.batch_key],
+            args=[uuid.uuid4().hex]
+        )
+        if token is None:
+            return 0
+        if isinstance(token, bytes):
+            token = token.decode()
+
+        counts = {
+            int(film_id): int(count)
+            for film_id, count in
+            self.client.hgetall(self.processing_key).items()
+        }
+        apply_visit_batch(token, counts)
+        self.cleanup(
+            keys=[self.processing_key, self.batch_key],
+            args=[token]
+        )
+        return len(counts)
+
+
+@lru_cache(maxsize=None)
+def get_visit_buffer():
+    config = settings.VISIT_COUNT_BUFFER
+    buffer_class = import_string(config["BACKEND"])
+    return buffer_class(**config.get("OPTIONS", {}))
+
+
+@receiver(setting_changed)
+def reset_visit_buffer(setting, **kwargs):
+    if setting == "VISIT_COUNT_BUFFER":
+        get_visit_buffer.cache_clear()